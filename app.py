@@ -1,12 +1,39 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime, timedelta
-import numpy as np
-import math
-import io
+
+# Chart builders (plotly) and Excel export (xlsxwriter) are imported where
+# they are first used, so a page that draws no chart never loads them
+from background_jobs import JobBoard, JobPool, completed, wait_for
+from backtest import backtest_summary, rolling_origin_backtest
+from columnar_store import append_mapped, mapped_history
+from exports import forecast_to_csv, forecast_to_excel
+from data_table import PAGE_SIZES, format_page, page_count, row_positions, table_columns
+from figure_cache import FigureCache
+from forecast_cache import forecast_key, frame_fingerprint
+from forecast_engine import (
+    DEFAULT_MODEL,
+    DEFAULT_SEED,
+    FORECAST_MODELS,
+    REQUIRED_COLUMNS,
+    UPLOADED_STREAM,
+    HistoryFit,
+    default_forecast_start,
+    forecast_from_history,
+    restaurants,
+    stack_forecasts,
+)
+from forecast_executor import DEFAULT_WORKERS, restaurant_forecast
+from history_index import ROLLING_WINDOWS, index_history, save_index
+from ingestion import append_delta, content_hash, daily_snapshot_key, ingest_transactions, ingest_upload
+from profiling import PROFILE_BY_DEFAULT, RerunProfiler
+from reconciliation import (
+    DEFAULT_RECONCILIATION,
+    RECONCILIATION_METHODS,
+    reconcile_history_forecast,
+)
+from sales_store import SalesStore
+from seasonal_model import MIN_HISTORY_DAYS
+from shared_cache import DATASET_ENTRIES, SPILL_BY_DEFAULT, SPILL_DIR, SharedCache, dataset_key
 
 # Page configuration
 st.set_page_config(
@@ -16,63 +43,15 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Restaurant configurations with enhanced data
-restaurants = {
-    'maslow': {
-        'name': 'Maslow Mégisserie',
-        'concept': 'Artisanal Vegetarian • Shared Plates',
-        'color': '#FF8C00',
-        'light_color': '#FFE4B5',
-        'base_metrics': {
-            'revenue': 1200,
-            'customers': 72,
-            'staff_needed': 8,
-            'products': {
-                'Vegetarian Bowl': 25,
-                'Shared Tapas': 30,
-                'Artisan Salads': 15,
-                'Fresh Juices': 20,
-                'Dessert Plates': 12
-            }
-        }
-    },
-    'fellows': {
-        'name': 'Fellows Restaurant',
-        'concept': 'Artisanal Pasta • 100% Maison',
-        'color': '#2F2F2F',
-        'light_color': '#E8E8E8',
-        'base_metrics': {
-            'revenue': 950,
-            'customers': 108,
-            'staff_needed': 6,
-            'products': {
-                'Fresh Pasta': 40,
-                'Risotto': 20,
-                'Wine Selection': 35,
-                'Antipasti': 18,
-                'Tiramisu': 15
-            }
-        }
-    },
-    'temple': {
-        'name': 'Maslow Temple',
-        'concept': 'Premium Experience • Temple',
-        'color': '#8B0000',
-        'light_color': '#FFB6C1',
-        'base_metrics': {
-            'revenue': 1800,
-            'customers': 30,
-            'staff_needed': 12,
-            'products': {
-                'Tasting Menu': 15,
-                'Premium Wine': 25,
-                'Appetizer Course': 30,
-                'Main Course': 30,
-                'Dessert Course': 30
-            }
-        }
-    }
-}
+@st.cache_resource
+def shared_cache():
+    """One cache of datasets and forecasts per server process, shared by every session"""
+    return SharedCache(spill_dir=SPILL_DIR if SPILL_BY_DEFAULT else None)
+
+@st.cache_resource
+def job_pool():
+    """Worker threads that run every session's forecasts in the background"""
+    return JobPool()
 
 # Initialize session state
 if 'uploaded_data' not in st.session_state:
@@ -85,6 +64,49 @@ if 'current_view' not in st.session_state:
     st.session_state.current_view = 'detailed_forecast'
 if 'use_uploaded_data' not in st.session_state:
     st.session_state.use_uploaded_data = False
+if 'upload_digest' not in st.session_state:
+    st.session_state.upload_digest = None
+    st.session_state.upload_base_digest = None
+    st.session_state.applied_deltas = []
+if 'history_fit' not in st.session_state:
+    st.session_state.history_fit = None
+    st.session_state.history_fit_key = None
+if 'history_index' not in st.session_state:
+    st.session_state.history_index = None
+    st.session_state.history_index_key = None
+if 'forecast_cache' not in st.session_state:
+    # Views of the process-wide cache: equal data in two sessions is stored once
+    st.session_state.forecast_cache = shared_cache().open_session()
+    st.session_state.dataset_cache = shared_cache().open_session(
+        DATASET_ENTRIES,
+        session_id=st.session_state.forecast_cache.session_id
+    )
+if 'figure_cache' not in st.session_state:
+    st.session_state.figure_cache = FigureCache()
+if 'exports' not in st.session_state:
+    st.session_state.exports = {}
+if 'forecast_seed' not in st.session_state:
+    st.session_state.forecast_seed = DEFAULT_SEED
+if 'forecast_model' not in st.session_state:
+    st.session_state.forecast_model = DEFAULT_MODEL
+if 'reconciliation' not in st.session_state:
+    st.session_state.reconciliation = DEFAULT_RECONCILIATION
+if 'forecast_workers' not in st.session_state:
+    st.session_state.forecast_workers = DEFAULT_WORKERS
+if 'restaurant_timings' not in st.session_state:
+    st.session_state.restaurant_timings = {}
+if 'forecast_jobs' not in st.session_state:
+    st.session_state.forecast_jobs = JobBoard(job_pool(), max_running=st.session_state.forecast_workers)
+if 'profiler' not in st.session_state:
+    st.session_state.profiler = RerunProfiler()
+
+# Stage timers are no-ops unless profiling is switched on in the sidebar
+profiler = st.session_state.profiler
+profiler.start_rerun(st.session_state.get('profiling_enabled', PROFILE_BY_DEFAULT))
+
+# Jobs of the previous rerun are stale until this one asks for them again
+jobs = st.session_state.forecast_jobs
+jobs.start_rerun()
 
 # Generate forecast data based on source - moved up to get colors early
 if st.session_state.use_uploaded_data and st.session_state.uploaded_data is not None:
@@ -170,215 +192,205 @@ st.markdown(f"""
 </style>
 """, unsafe_allow_html=True)
 
-def calculate_staff_requirement(customers, restaurant_key):
-    """Calculate staff needed based on customer volume"""
-    base_staff = restaurants[restaurant_key]['base_metrics']['staff_needed']
-    base_customers = restaurants[restaurant_key]['base_metrics']['customers']
-    
-    # Staff scaling formula: base staff + additional staff based on customer increase
-    if restaurant_key == 'temple':
-        staff_ratio = 0.4  # Premium service needs more staff per customer
-    elif restaurant_key == 'maslow':
-        staff_ratio = 0.11  # Shared plates need moderate staffing
-    else:
-        staff_ratio = 0.06  # Fellows - efficient pasta service
+def forecast_uploaded_data(uploaded_data, days_ahead, seed, model, fit, reconciliation):
+    """Forecast of uploaded data, reconciled with its items per customer (runs as a background job)"""
+    # All horizon days and product columns are computed as arrays
+    forecast = forecast_from_history(uploaded_data, days_ahead, seed=seed, model=model, fit=fit)
     
-    calculated_staff = base_staff + (customers - base_customers) * staff_ratio
-    return max(3, math.ceil(calculated_staff))  # Minimum 3 staff
-
-def generate_forecast_from_data(uploaded_data, days_ahead):
-    """Generate forecast from uploaded data"""
-    try:
-        # Ensure we have the required columns
-        required_columns = ['date', 'revenue', 'customers']
-        missing_columns = [col for col in required_columns if col not in uploaded_data.columns]
-        
-        if missing_columns:
-            st.error(f"Missing required columns: {missing_columns}")
-            st.info("Required columns: date, revenue, customers")
-            st.info("Optional columns: staff, product quantities")
-            return None
-        
-        # Convert date column
-        uploaded_data['date'] = pd.to_datetime(uploaded_data['date'])
-        uploaded_data = uploaded_data.sort_values('date')
-        
-        # Calculate basic statistics for forecasting
-        avg_revenue = uploaded_data['revenue'].mean()
-        avg_customers = uploaded_data['customers'].mean()
-        revenue_std = uploaded_data['revenue'].std()
-        customers_std = uploaded_data['customers'].std()
-        
-        # Generate forecast
-        forecast_data = []
-        last_date = uploaded_data['date'].max()
-        
-        for i in range(days_ahead):
-            forecast_date = last_date + timedelta(days=i+1)
-            
-            # Add some realistic variation and trend
-            trend_factor = 1.0 + (0.1 * math.sin(2 * math.pi * i / 365))  # Seasonal trend
-            random_factor = 0.9 + np.random.random() * 0.2  # ±10% variation
-            
-            forecasted_revenue = int(avg_revenue * trend_factor * random_factor)
-            forecasted_customers = int(avg_customers * trend_factor * random_factor)
-            
-            # If staff column exists in uploaded data, use it for calculation
-            if 'staff' in uploaded_data.columns:
-                avg_staff = uploaded_data['staff'].mean()
-                forecasted_staff = max(3, int(avg_staff * trend_factor * random_factor))
-            else:
-                # Calculate based on customers (default logic)
-                forecasted_staff = max(3, math.ceil(forecasted_customers * 0.1))
-            
-            forecast_row = {
-                'date': forecast_date.strftime('%b %d'),
-                'full_date': forecast_date.strftime('%Y-%m-%d'),
-                'revenue': forecasted_revenue,
-                'customers': forecasted_customers,
-                'staff_needed': forecasted_staff,
-                'day_of_week': forecast_date.strftime('%A')
-            }
-            
-            # Add product forecasts if product columns exist
-            product_columns = [col for col in uploaded_data.columns if col not in ['date', 'revenue', 'customers', 'staff']]
-            for product in product_columns:
-                if uploaded_data[product].dtype in ['int64', 'float64']:
-                    avg_product = uploaded_data[product].mean()
-                    forecast_row[product] = int(avg_product * trend_factor * random_factor)
-            
-            forecast_data.append(forecast_row)
-        
-        return pd.DataFrame(forecast_data)
-        
-    except Exception as e:
-        st.error(f"Error processing uploaded data: {str(e)}")
-        return None
+    # Products are reconciled with the customer-driven total volume
+    return reconcile_history_forecast(forecast, uploaded_data, reconciliation)
 
-def generate_enhanced_forecast_data(restaurant_key, days):
-    """Generate comprehensive forecast data for default restaurants"""
-    restaurant = restaurants[restaurant_key]
-    base = restaurant['base_metrics']
-    
-    data = []
-    
-    for i in range(days):
-        date = datetime.now() + timedelta(days=i+1)
-        
-        # Add realistic variation
-        weekend_boost = 1.3 if date.weekday() >= 4 else 1.0  # Friday, Saturday, Sunday
-        seasonal_factor = 1.0 + 0.2 * math.sin(2 * math.pi * date.timetuple().tm_yday / 365)
-        random_variation = 0.85 + np.random.random() * 0.3
-        
-        # Calculate base metrics
-        multiplier = weekend_boost * seasonal_factor * random_variation
-        
-        customers = int(base['customers'] * multiplier)
-        revenue = int(base['revenue'] * multiplier)
-        staff_needed = calculate_staff_requirement(customers, restaurant_key)
-        
-        # Calculate product quantities
-        products = {}
-        for product, base_qty in base['products'].items():
-            products[product] = int(base_qty * multiplier)
-        
-        data.append({
-            'date': date.strftime('%b %d'),
-            'full_date': date.strftime('%Y-%m-%d'),
-            'revenue': revenue,
-            'customers': customers,
-            'staff_needed': staff_needed,
-            'day_of_week': date.strftime('%A'),
-            **products
-        })
+def forecast_job(key, prepare):
+    """Future of the forecast for ``key``: already done when cached, otherwise a background job
     
-    return pd.DataFrame(data)
+    ``prepare()`` runs here, on the script thread, and returns the function
+    the job calls; that function must not use Streamlit or session state.
+    A job already submitted for ``key`` is reused, so a rerun picks up the
+    work of the one it interrupted.
+    """
+    cache = st.session_state.forecast_cache
+    forecast = cache.get(key)
+    if forecast is not None:
+        return completed(forecast)
+    compute = prepare()
+    shared = cache.shared
+    # Through the shared cache, so sessions asking for the same forecast compute it once
+    return jobs.submit(key, lambda: shared.get_or_compute(key, compute)[0])
 
-def create_metric_card(title, value, subtitle=""):
-    """Create a metric card using Streamlit native components"""
-    return title, value, subtitle
-
-def create_forecast_charts(forecast_data, restaurant_color):
-    """Create comprehensive forecast charts"""
+def collect(futures, label):
+    """{key: result} of background jobs, showing a status line while they run
     
-    # Main metrics chart
-    fig_main = make_subplots(
-        rows=2, cols=2,
-        subplot_titles=('Revenue Forecast', 'Customer Forecast', 'Staff Requirements', 'Revenue vs Customers'),
-        specs=[[{"secondary_y": False}, {"secondary_y": False}],
-               [{"secondary_y": False}, {"secondary_y": False}]]
+    Redrawing the status line is where Streamlit stops a rerun whose
+    widgets changed, so a stale rerun does not wait for its forecasts.
+    """
+    status = st.empty()
+    results = wait_for(
+        futures.values(),
+        poll=lambda elapsed, done, total: status.caption(
+            f"⏳ {label}… {done}/{total} done ({elapsed:.1f}s)" if total > 1 else f"⏳ {label}… ({elapsed:.1f}s)"
+        )
     )
+    status.empty()
+    # Hold the results in this session's view of the shared cache
+    cache = st.session_state.forecast_cache
+    for key, result in zip(futures, results):
+        cache.put(key, result)
+    return dict(zip(futures, results))
+
+def uploaded_forecast_job(uploaded_data, days_ahead):
+    """Future of the uploaded data's forecast, or None when required columns are missing"""
+    # Ensure we have the required columns
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in uploaded_data.columns]
     
-    # Revenue
-    fig_main.add_trace(
-        go.Scatter(x=forecast_data['date'], y=forecast_data['revenue'],
-                  mode='lines+markers', name='Revenue', 
-                  line=dict(color=restaurant_color, width=3)),
-        row=1, col=1
-    )
+    if missing_columns:
+        st.error(f"Missing required columns: {missing_columns}")
+        st.info("Required columns: date, revenue, customers")
+        st.info("Optional columns: staff, product quantities")
+        return None
     
-    # Customers
-    fig_main.add_trace(
-        go.Scatter(x=forecast_data['date'], y=forecast_data['customers'],
-                  mode='lines+markers', name='Customers',
-                  line=dict(color='#1f77b4', width=3)),
-        row=1, col=2
-    )
+    def prepare():
+        # The fit lives in session state and is updated by delta uploads, so it is made here
+        model = st.session_state.forecast_model
+        fit = uploaded_history_fit(uploaded_data) if model == 'seasonal' else None
+        seed, reconciliation = st.session_state.forecast_seed, st.session_state.reconciliation
+        return lambda: forecast_uploaded_data(uploaded_data, days_ahead, seed, model, fit, reconciliation)
     
-    # Staff
-    fig_main.add_trace(
-        go.Scatter(x=forecast_data['date'], y=forecast_data['staff_needed'],
-                  mode='lines+markers', name='Staff Needed',
-                  line=dict(color='#ff7f0e', width=3)),
-        row=2, col=1
+    return forecast_job(uploaded_forecast_key(uploaded_data, days_ahead), prepare)
+
+def uploaded_forecast_key(uploaded_data, days_ahead):
+    """Forecast cache key for the uploaded data"""
+    # The upload hash identifies ingested data without rehashing the frame
+    fingerprint = st.session_state.upload_digest or frame_fingerprint(uploaded_data)
+    return forecast_key(
+        fingerprint,
+        days_ahead,
+        {'model': st.session_state.forecast_model, 'reconciliation': st.session_state.reconciliation},
+        seed=st.session_state.forecast_seed
     )
-    
-    # Revenue vs Customers scatter
-    fig_main.add_trace(
-        go.Scatter(x=forecast_data['customers'], y=forecast_data['revenue'],
-                  mode='markers', name='Revenue vs Customers',
-                  marker=dict(color=restaurant_color, size=8)),
-        row=2, col=2
+
+def restaurant_forecast_key(restaurant_key, days):
+    """Forecast cache key for a default restaurant"""
+    # Synthetic forecasts start tomorrow, so the start date is part of the key
+    return forecast_key(
+        restaurant_key,
+        days,
+        {
+            'start': default_forecast_start().strftime('%Y-%m-%d'),
+            'reconciliation': st.session_state.reconciliation
+        },
+        seed=st.session_state.forecast_seed
     )
-    
-    fig_main.update_layout(height=600, showlegend=False, title_text="Key Metrics Forecast")
-    fig_main.update_xaxes(title_text="Date", row=1, col=1)
-    fig_main.update_xaxes(title_text="Date", row=1, col=2)
-    fig_main.update_xaxes(title_text="Date", row=2, col=1)
-    fig_main.update_xaxes(title_text="Customers", row=2, col=2)
-    fig_main.update_yaxes(title_text="Revenue (€)", row=1, col=1)
-    fig_main.update_yaxes(title_text="Customers", row=1, col=2)
-    fig_main.update_yaxes(title_text="Staff Count", row=2, col=1)
-    fig_main.update_yaxes(title_text="Revenue (€)", row=2, col=2)
-    
-    return fig_main
 
-def create_product_forecast_chart(forecast_data, products_list, restaurant_color):
-    """Create product quantity forecast chart"""
-    fig = go.Figure()
-    
-    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7']
-    
-    for i, product in enumerate(products_list):
-        if product in forecast_data.columns:
-            fig.add_trace(go.Scatter(
-                x=forecast_data['date'],
-                y=forecast_data[product],
-                mode='lines+markers',
-                name=product,
-                line=dict(color=colors[i % len(colors)], width=2),
-                marker=dict(size=6)
-            ))
+def uploaded_history_fit(uploaded_data):
+    """Seasonal model statistics of the uploaded history, fit once and then updated by delta uploads"""
+    key = st.session_state.upload_digest or frame_fingerprint(uploaded_data)
+    if st.session_state.history_fit_key != key:
+        st.session_state.history_fit = HistoryFit.fit(uploaded_data)
+        st.session_state.history_fit_key = key
+    return st.session_state.history_fit
+
+def apply_delta_upload(file_name, data, delta_digest):
+    """Append a file of new days to the uploaded history; returns the number of days added"""
+    history = st.session_state.uploaded_data
+    previous = st.session_state.upload_digest or frame_fingerprint(history)
+    fit = st.session_state.history_fit if st.session_state.history_fit_key == previous else None
+    index = st.session_state.history_index if st.session_state.history_index_key == previous else None
+    if index is not None:
+        last_date = index.last_date()
+    else:
+        last_date = fit.last_date if fit is not None else None
+    key, delta = append_delta(history, previous, file_name, data, last_date)
+    frame = append_mapped(previous, key, history, delta)
     
-    fig.update_layout(
-        title="Product Quantity Forecast",
-        xaxis_title="Date",
-        yaxis_title="Quantity",
-        height=400,
-        hovermode='x unified'
-    )
+    # Only the new rows update the model statistics and the date index; running
+    # jobs may be reading the fit, so they finish first
+    st.session_state.forecast_jobs.cancel_all(wait_running=True)
+    if fit is not None and fit.update(delta):
+        st.session_state.history_fit_key = key
+    else:
+        st.session_state.history_fit, st.session_state.history_fit_key = None, None
+    if index is not None:
+        index.append(UPLOADED_STREAM, delta['date'], delta[index.columns].to_numpy(dtype=float))
+        save_index(index, key)
+        st.session_state.history_index_key = key
     
-    return fig
+    # Forecasts and figures of the previous history can no longer be requested
+    st.session_state.forecast_cache.discard_source(previous)
+    st.session_state.figure_cache.discard_source(previous)
+    st.session_state.dataset_cache.put(dataset_key(key), frame)
+    st.session_state.uploaded_data = frame
+    st.session_state.upload_digest = key
+    st.session_state.applied_deltas.append(delta_digest)
+    return len(delta)
+
+def uploaded_history_index(uploaded_data):
+    """Sorted date index of the uploaded history, built once per upload"""
+    key = st.session_state.upload_digest or frame_fingerprint(uploaded_data)
+    if st.session_state.history_index_key != key:
+        with profiler.stage('history index'):
+            st.session_state.history_index = index_history(uploaded_data, key)
+        st.session_state.history_index_key = key
+    return st.session_state.history_index
+
+def backtest_jobs(uploaded_data, days_ahead):
+    """{cache key: future} of the rolling-origin backtest of every model on the uploaded data"""
+    fingerprint = st.session_state.upload_digest or frame_fingerprint(uploaded_data)
+    workers = st.session_state.forecast_workers
+    futures = {}
+    for model in FORECAST_MODELS:
+        key = forecast_key(fingerprint, days_ahead, {'model': model, 'backtest': True})
+        futures[key] = forecast_job(key, lambda model=model: lambda: rolling_origin_backtest(
+            uploaded_data,
+            days_ahead,
+            model=model,
+            workers=workers
+        ))
+    return futures
+
+def restaurant_forecast_jobs(restaurant_keys, days):
+    """{cache key: future} of default restaurants' forecasts, one background job per miss"""
+    # Resolve once so every job forecasts the same dates
+    start = default_forecast_start()
+    seed, reconciliation = st.session_state.forecast_seed, st.session_state.reconciliation
+    return {
+        restaurant_forecast_key(rest_key, days): forecast_job(
+            restaurant_forecast_key(rest_key, days),
+            lambda rest_key=rest_key: lambda: restaurant_forecast(rest_key, days, start, seed, reconciliation)
+        )
+        for rest_key in restaurant_keys
+    }
+
+def has_export(forecast_id, export_format):
+    """Whether an export of this forecast was already built"""
+    exports = st.session_state.exports
+    return exports.get('forecast_id') == forecast_id and export_format in exports
+
+def get_export(forecast_id, forecast_data, export_format):
+    """Export bytes for a forecast, built on first request and kept while the forecast is unchanged"""
+    exports = st.session_state.exports
+    if exports.get('forecast_id') != forecast_id:
+        exports.clear()
+        exports['forecast_id'] = forecast_id
+    if export_format not in exports:
+        if export_format == 'csv':
+            exports[export_format] = forecast_to_csv(forecast_data)
+        else:
+            exports[export_format] = forecast_to_excel(forecast_data)
+    return exports[export_format]
+
+def cached_figure(figure_key, build):
+    """Figure from the session figure cache, built on a miss"""
+    return st.session_state.figure_cache.get_or_build(figure_key, build)
+
+def show_payload(fig, figure_key):
+    """Caption with the size of a cached figure as sent to the browser"""
+    payload_bytes, points = st.session_state.figure_cache.payload(figure_key)
+    renderer = "WebGL" if any(trace.type == 'scattergl' for trace in fig.data) else "SVG"
+    st.caption(f"📦 Chart payload: {payload_bytes / 1024:.1f} KB • {points:,} points • {renderer}")
+
+def create_metric_card(title, value, subtitle=""):
+    """Create a metric card using Streamlit native components"""
+    return title, value, subtitle
 
 # Sidebar for controls
 with st.sidebar:
@@ -409,11 +421,43 @@ with st.sidebar:
         )
         
         if uploaded_file is not None:
+            stream_transactions = uploaded_file.name.endswith('.csv') and st.checkbox(
+                "🧾 Transaction-level export",
+                help="One row per ticket line: streamed in chunks and aggregated to daily totals"
+            )
             try:
-                if uploaded_file.name.endswith('.csv'):
-                    st.session_state.uploaded_data = pd.read_csv(uploaded_file)
-                else:
-                    st.session_state.uploaded_data = pd.read_excel(uploaded_file)
+                # Parse only when the file content changes; reruns reuse the snapshot
+                with uploaded_file.getbuffer() as upload_buffer:
+                    digest = content_hash(upload_buffer)
+                upload_key = daily_snapshot_key(digest) if stream_transactions else digest
+                
+                if upload_key != st.session_state.upload_base_digest:
+                    with profiler.stage('ingestion'):
+                        if stream_transactions:
+                            def ingest():
+                                progress_bar = st.progress(0.0, text="Aggregating ticket lines...")
+                                _, frame = ingest_transactions(
+                                    uploaded_file,
+                                    digest,
+                                    progress=lambda fraction, rows: progress_bar.progress(
+                                        fraction, text=f"Aggregated {rows:,} ticket lines"
+                                    )
+                                )
+                                progress_bar.empty()
+                                return frame
+                        else:
+                            def ingest():
+                                return ingest_upload(uploaded_file.name, uploaded_file.getvalue(), digest)[1]
+                        # Another session may already hold the same file, parsed; the history
+                        # itself is read from memory-mapped columns, parsed only once ever
+                        frame = st.session_state.dataset_cache.get_or_compute(
+                            dataset_key(upload_key),
+                            lambda: mapped_history(upload_key, ingest)
+                        )
+                        st.session_state.uploaded_data = frame
+                        st.session_state.upload_digest = upload_key
+                        st.session_state.upload_base_digest = upload_key
+                        st.session_state.applied_deltas = []
                 
                 st.success(f"✅ Data uploaded successfully! {len(st.session_state.uploaded_data)} rows")
                 
@@ -424,6 +468,29 @@ with st.sidebar:
             except Exception as e:
                 st.error(f"Error reading file: {str(e)}")
                 st.session_state.uploaded_data = None
+                st.session_state.upload_digest = None
+                st.session_state.upload_base_digest = None
+        
+        if uploaded_file is not None and st.session_state.uploaded_data is not None:
+            # Daily refresh: only the new days are uploaded and appended to the stored history
+            delta_file = st.file_uploader(
+                "➕ Append new days",
+                type=['csv', 'xlsx', 'xls'],
+                key='delta_file',
+                help="Days after the last stored day, with the same columns as the history"
+            )
+            if delta_file is not None:
+                with delta_file.getbuffer() as delta_buffer:
+                    delta_digest = content_hash(delta_buffer)
+                if delta_digest not in st.session_state.applied_deltas:
+                    try:
+                        with profiler.stage('delta append'):
+                            appended_days = apply_delta_upload(delta_file.name, delta_file.getvalue(), delta_digest)
+                        st.success(f"➕ Appended {appended_days} day(s): {len(st.session_state.uploaded_data)} rows")
+                    except ValueError as e:
+                        st.error(f"Delta upload rejected: {str(e)}")
+            if st.session_state.applied_deltas:
+                st.caption(f"{len(st.session_state.applied_deltas)} delta upload(s) appended to the stored history")
         
         # Sample data template
         st.markdown("---")
@@ -468,36 +535,90 @@ with st.sidebar:
         index=6  # Default to 7 days
     )
     
+    # Same seed + same inputs = same forecast, in every view and every rerun
+    st.number_input(
+        "🎲 Random seed",
+        min_value=0,
+        step=1,
+        key='forecast_seed',
+        help="Seeds the random variation of the forecasts"
+    )
+    
+    if st.session_state.use_uploaded_data:
+        st.selectbox(
+            "📐 Forecast model",
+            options=list(FORECAST_MODELS),
+            format_func=lambda x: {
+                'seasonal': "Seasonal (trend + weekday + yearly)",
+                'baseline': "Baseline (history average)"
+            }[x],
+            key='forecast_model',
+            help="The seasonal model is fit by least squares and shows 80% prediction intervals"
+        )
+    
+    st.selectbox(
+        "🧮 Reconciliation",
+        options=list(RECONCILIATION_METHODS),
+        format_func=lambda x: {
+            'mint': "MinT (weighted least squares)",
+            'bottom_up': "Bottom-up (product forecasts)",
+            'top_down': "Top-down (customer volume)"
+        }[x],
+        key='reconciliation',
+        help="Makes product forecasts add up to each restaurant's customer-driven volume and to the group total"
+    )
+    
     # View selection
     st.markdown("---")
     st.session_state.current_view = st.selectbox(
         "📊 Dashboard View",
-        options=['detailed_forecast', 'overview', 'comparison'],
+        options=['detailed_forecast', 'overview', 'comparison', 'backtest'],
         format_func=lambda x: {
             'detailed_forecast': "🔮 Detailed Forecasting",
             'overview': "📈 Overview Dashboard", 
-            'comparison': "🏢 Restaurant Comparison"
+            'comparison': "🏢 Restaurant Comparison",
+            'backtest': "🎯 Backtest Accuracy"
         }[x],
-        index=['detailed_forecast', 'overview', 'comparison'].index(st.session_state.current_view)
+        index=['detailed_forecast', 'overview', 'comparison', 'backtest'].index(st.session_state.current_view)
     )
+    
+    if st.session_state.current_view == 'comparison' and not st.session_state.use_uploaded_data:
+        st.slider(
+            "⚡ Parallel forecast workers",
+            min_value=1,
+            max_value=16,
+            key='forecast_workers',
+            help="Forecasts this session runs at once, in the server's shared thread pool"
+        )
+        st.session_state.forecast_jobs.max_running = st.session_state.forecast_workers
 
-# Generate forecast data based on source
+# Submit the forecasts this view needs; they run in the background while the page is drawn
+comparison_futures = backtest_futures = None
 if st.session_state.use_uploaded_data and st.session_state.uploaded_data is not None:
-    forecast_data = generate_forecast_from_data(st.session_state.uploaded_data, st.session_state.forecast_days)
+    forecast_future = uploaded_forecast_job(st.session_state.uploaded_data, st.session_state.forecast_days)
+    forecast_id = uploaded_forecast_key(st.session_state.uploaded_data, st.session_state.forecast_days)
     restaurant_name = "Your Restaurant"
     restaurant_color = "#4CAF50"
     products_list = [col for col in st.session_state.uploaded_data.columns if col not in ['date', 'revenue', 'customers', 'staff']]
+    if st.session_state.current_view == 'backtest' and forecast_future is not None:
+        backtest_futures = backtest_jobs(st.session_state.uploaded_data, st.session_state.forecast_days)
 else:
     if not st.session_state.use_uploaded_data:
         current_restaurant = restaurants[st.session_state.selected_restaurant]
-        forecast_data = generate_enhanced_forecast_data(st.session_state.selected_restaurant, st.session_state.forecast_days)
+        forecast_id = restaurant_forecast_key(st.session_state.selected_restaurant, st.session_state.forecast_days)
+        forecast_future = restaurant_forecast_jobs([st.session_state.selected_restaurant], st.session_state.forecast_days)[forecast_id]
         restaurant_name = current_restaurant['name']
         restaurant_color = current_restaurant['color']
         products_list = list(current_restaurant['base_metrics']['products'].keys())
+        if st.session_state.current_view == 'comparison':
+            comparison_futures = restaurant_forecast_jobs(list(restaurants), st.session_state.forecast_days)
     else:
         st.warning("Please upload data to continue with forecasting.")
         st.stop()
 
+# Jobs only an earlier rerun asked for are cancelled before they start
+jobs.cancel_stale()
+
 # Header
 if not st.session_state.use_uploaded_data:
     current_restaurant = restaurants[st.session_state.selected_restaurant]
@@ -530,6 +651,17 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
+# The header is drawn; now wait for the forecast
+forecast_data = None
+if forecast_future is not None:
+    with profiler.stage('forecast'):
+        try:
+            forecast_data = collect({forecast_id: forecast_future}, "Forecasting")[forecast_id]
+        except Exception as e:
+            if not st.session_state.use_uploaded_data:
+                raise
+            st.error(f"Error processing uploaded data: {str(e)}")
+
 if forecast_data is not None and not forecast_data.empty:
     if st.session_state.current_view == 'detailed_forecast':
         # Enhanced forecast view with restaurant-specific colors
@@ -590,9 +722,50 @@ if forecast_data is not None and not forecast_data.empty:
         tab1, tab2, tab3 = st.tabs(["📈 Main Metrics", "🍽️ Product Forecast", "📋 Detailed Data"])
         
         with tab1:
+            # Uploaded history can be drawn behind the forecast and zoomed into
+            history_index, chart_window = None, None
+            if st.session_state.use_uploaded_data and st.checkbox("📜 Show history", key='show_history'):
+                history_index = uploaded_history_index(st.session_state.uploaded_data)
+                first_day = pd.Timestamp(history_index.first_date()).date()
+                last_day = pd.to_datetime(forecast_data['full_date'].iloc[-1]).date()
+                chart_window = st.slider(
+                    "🔍 Zoom",
+                    min_value=first_day,
+                    max_value=last_day,
+                    value=(first_day, last_day),
+                    help="Long ranges are downsampled for display; narrow the range to see every day"
+                )
+                
+                # Trailing totals up to the last day of history, from the index's running sums
+                last_history_day = history_index.last_date()
+                totals = []
+                for window in ROLLING_WINDOWS:
+                    sums = history_index.rolling_sum(
+                        window=window, start=last_history_day, columns=['revenue', 'customers']
+                    ).iloc[-1]
+                    totals.append(f"last {window} days: €{sums['revenue']:,.0f} • {sums['customers']:,.0f} customers")
+                st.caption(" | ".join(totals))
+            
             # Main forecast charts
-            fig_main = create_forecast_charts(forecast_data, restaurant_color)
-            st.plotly_chart(fig_main, use_container_width=True)
+            main_key = (forecast_id, 'main', history_index is not None, chart_window)
+            with profiler.stage('charts: build'):
+                from charts import create_forecast_charts
+                fig_main = cached_figure(
+                    main_key,
+                    lambda: create_forecast_charts(
+                        forecast_data,
+                        restaurant_color,
+                        None if history_index is None else history_index.range(
+                            start=chart_window[0],
+                            end=chart_window[1],
+                            columns=[col for col in ('revenue', 'customers', 'staff') if col in history_index.columns]
+                        ),
+                        chart_window
+                    )
+                )
+            with profiler.stage('charts: render'):
+                st.plotly_chart(fig_main, use_container_width=True)
+            show_payload(fig_main, main_key)
             
             # Staff optimization insights
             st.markdown(f"""
@@ -620,8 +793,26 @@ if forecast_data is not None and not forecast_data.empty:
         with tab2:
             # Product forecast
             if products_list:
-                fig_products = create_product_forecast_chart(forecast_data, products_list, restaurant_color)
-                st.plotly_chart(fig_products, use_container_width=True)
+                # Only the selected products are drawn, so the payload grows with the selection
+                shown_products = st.multiselect(
+                    "Products to chart",
+                    options=products_list,
+                    default=products_list[:10],
+                    key=f"chart_products_{forecast_id[0]}"
+                )
+                # One product figure per forecast: a new selection patches its traces
+                products_key = (forecast_id, 'products')
+                with profiler.stage('product chart: build'):
+                    from charts import create_product_forecast_chart, update_product_forecast_chart
+                    fig_products = st.session_state.figure_cache.get_or_patch(
+                        products_key,
+                        tuple(shown_products),
+                        lambda: create_product_forecast_chart(forecast_data, shown_products, restaurant_color),
+                        lambda fig: update_product_forecast_chart(fig, forecast_data, shown_products)
+                    )
+                with profiler.stage('product chart: render'):
+                    st.plotly_chart(fig_products, use_container_width=True)
+                show_payload(fig_products, products_key)
                 
                 # Product insights
                 st.markdown(f"""
@@ -670,44 +861,63 @@ if forecast_data is not None and not forecast_data.empty:
             </div>
             """, unsafe_allow_html=True)
             
-            # Format the dataframe for display
-            display_df = forecast_data.copy()
-            display_df['Revenue'] = display_df['revenue'].apply(lambda x: f"€{x:,}")
-            display_df['Customers'] = display_df['customers']
-            display_df['Staff Needed'] = display_df['staff_needed']
+            # Sorting and filtering run on row positions; only the visible page is formatted
+            display_columns = table_columns(forecast_data, products_list)
+            col1, col2, col3, col4 = st.columns([2, 1, 3, 1])
+            with col1:
+                sort_by = st.selectbox("Sort by", options=list(display_columns), key='table_sort')
+            with col2:
+                descending = st.toggle("Descending", key='table_descending')
+            with col3:
+                days_filter = st.multiselect(
+                    "Days of week",
+                    options=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+                    key='table_days'
+                )
+            with col4:
+                page_size = st.selectbox("Rows per page", options=PAGE_SIZES, key='table_page_size')
             
-            # Select columns to display
-            display_columns = ['date', 'Revenue', 'Customers', 'Staff Needed']
-            for product in products_list:
-                if product in forecast_data.columns:
-                    display_columns.append(product)
+            with profiler.stage('table: format'):
+                positions = row_positions(forecast_data, display_columns[sort_by], descending, days_filter)
+                n_pages = page_count(len(positions), page_size)
+                # A shorter forecast or a narrower filter can leave the old page out of range
+                if st.session_state.get('table_page', 1) > n_pages:
+                    st.session_state.table_page = n_pages
+                page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key='table_page')
+                page_df = format_page(forecast_data, positions, display_columns, page, page_size)
             
-            st.dataframe(display_df[display_columns], use_container_width=True)
+            with profiler.stage('table: render'):
+                st.dataframe(page_df, use_container_width=True)
+            if len(positions):
+                start_row = (page - 1) * page_size
+                st.caption(f"Rows {start_row + 1}–{start_row + len(page_df)} of {len(positions)} • page {page} of {n_pages}")
+            else:
+                st.info("No forecast days match the filter.")
             
-            # Download buttons
+            # Download buttons - exports are only serialized once requested
+            export_name = f"forecast_{restaurant_name.lower().replace(' ', '_')}_{st.session_state.forecast_days}days"
             col1, col2 = st.columns(2)
             with col1:
-                csv = forecast_data.to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Forecast Data (CSV)",
-                    data=csv,
-                    file_name=f"forecast_{restaurant_name.lower().replace(' ', '_')}_{st.session_state.forecast_days}days.csv",
-                    mime="text/csv"
-                )
+                if has_export(forecast_id, 'csv') or st.button("📄 Prepare CSV export"):
+                    with profiler.stage('export: csv'):
+                        csv_export = get_export(forecast_id, forecast_data, 'csv')
+                    st.download_button(
+                        label="📥 Download Forecast Data (CSV)",
+                        data=csv_export,
+                        file_name=f"{export_name}.csv",
+                        mime="text/csv"
+                    )
             
             with col2:
-                # Create Excel file
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    forecast_data.to_excel(writer, sheet_name='Forecast', index=False)
-                excel_data = output.getvalue()
-                
-                st.download_button(
-                    label="📊 Download Forecast Data (Excel)",
-                    data=excel_data,
-                    file_name=f"forecast_{restaurant_name.lower().replace(' ', '_')}_{st.session_state.forecast_days}days.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                if has_export(forecast_id, 'xlsx') or st.button("📊 Prepare Excel export"):
+                    with profiler.stage('export: excel'):
+                        excel_export = get_export(forecast_id, forecast_data, 'xlsx')
+                    st.download_button(
+                        label="📊 Download Forecast Data (Excel)",
+                        data=excel_export,
+                        file_name=f"{export_name}.xlsx",
+                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
 
     elif st.session_state.current_view == 'overview':
         # Original overview functionality
@@ -752,25 +962,91 @@ if forecast_data is not None and not forecast_data.empty:
         </div>
         """, unsafe_allow_html=True)
         
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=forecast_data['date'],
-            y=forecast_data['revenue'],
-            mode='lines+markers',
-            name='Revenue',
-            line=dict(color=restaurant_color, width=3),
-            marker=dict(color=restaurant_color, size=8)
-        ))
-        
-        fig.update_layout(
-            height=400,
-            xaxis_title="Date",
-            yaxis_title="Revenue (€)",
-            template="plotly_white",
-            hovermode='x unified'
+        from charts import create_revenue_chart
+        fig = cached_figure(
+            (forecast_id, 'overview'),
+            lambda: create_revenue_chart(forecast_data, restaurant_color)
         )
         
-        st.plotly_chart(fig, use_container_width=True)
+        with profiler.stage('overview chart: render'):
+            st.plotly_chart(fig, use_container_width=True)
+
+    elif st.session_state.current_view == 'backtest':  # Only works with uploaded data
+        if not st.session_state.use_uploaded_data:
+            st.warning("Backtests replay your own history. Please switch to 'Upload Your Data' to use this feature.")
+        else:
+            st.markdown(f"""
+            <div class="insight-card">
+                <h3 style="color: {restaurant_color}; margin-bottom: 1rem;">
+                    🎯 Rolling-Origin Backtest - {st.session_state.forecast_days} day{'s' if st.session_state.forecast_days > 1 else ''} ahead
+                </h3>
+                <p style="color: #666; margin: 0;">Each day of your history is used as a forecast origin: the model is fit on the days before it and scored on the days after.</p>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            try:
+                with profiler.stage('backtest'):
+                    results = collect(backtest_futures, "Backtesting")
+                backtests = dict(zip(FORECAST_MODELS, results.values()))
+            except ValueError as e:
+                st.error(f"Unable to backtest: {str(e)}")
+            else:
+                summaries = {model: backtest_summary(results).set_index('series') for model, results in backtests.items()}
+                selected = summaries[st.session_state.forecast_model]
+                baseline = summaries['baseline']
+                
+                # Series missing too many days have no scored origins and NaN accuracy
+                unscored = [series for series in ('revenue', 'customers') if selected.loc[series, 'origins'] == 0]
+                if unscored:
+                    st.warning(
+                        f"Not enough recorded days to backtest {' and '.join(unscored)}: "
+                        f"each forecast origin needs {MIN_HISTORY_DAYS} recorded days before it."
+                    )
+                else:
+                    col1, col2, col3, col4 = st.columns(4)
+                    with col1:
+                        st.metric(
+                            label="💰 Revenue WAPE",
+                            value=f"{selected.loc['revenue', 'wape']:.1f}%",
+                            delta=f"{selected.loc['revenue', 'wape'] - baseline.loc['revenue', 'wape']:+.1f} pts vs baseline",
+                            delta_color="inverse"
+                        )
+                    with col2:
+                        st.metric(
+                            label="👥 Customers WAPE",
+                            value=f"{selected.loc['customers', 'wape']:.1f}%",
+                            delta=f"{selected.loc['customers', 'wape'] - baseline.loc['customers', 'wape']:+.1f} pts vs baseline",
+                            delta_color="inverse"
+                        )
+                    with col3:
+                        st.metric(
+                            label="⚖️ Revenue Bias",
+                            value=f"{selected.loc['revenue', 'bias']:+.1f}%"
+                        )
+                    with col4:
+                        st.metric(
+                            label="🧪 Forecasts Scored",
+                            value=f"{int(selected['origins'].sum()):,}"
+                        )
+                
+                # Error growth with the horizon for the headline metrics
+                by_horizon = backtests[st.session_state.forecast_model]
+                by_horizon = by_horizon[by_horizon['series'].isin(['revenue', 'customers'])]
+                from charts import create_backtest_horizon_chart
+                fig_horizon = create_backtest_horizon_chart(by_horizon, restaurant_color)
+                st.plotly_chart(fig_horizon, use_container_width=True)
+                
+                st.dataframe(
+                    selected.reset_index().rename(columns={
+                        'series': 'Series',
+                        'origins': 'Forecasts',
+                        'mape': 'MAPE (%)',
+                        'wape': 'WAPE (%)',
+                        'bias': 'Bias (%)'
+                    }).round(1),
+                    hide_index=True,
+                    use_container_width=True
+                )
 
     else:  # Comparison view - only works with default data
         if st.session_state.use_uploaded_data:
@@ -784,49 +1060,46 @@ if forecast_data is not None and not forecast_data.empty:
             </div>
             """, unsafe_allow_html=True)
             
-            # Generate comparison data for all restaurants
-            comparison_data = []
-            for rest_key, rest_data in restaurants.items():
-                temp_forecast = generate_enhanced_forecast_data(rest_key, st.session_state.forecast_days)
-                total_rev = temp_forecast['revenue'].sum()
-                total_cust = temp_forecast['customers'].sum()
-                avg_staff = temp_forecast['staff_needed'].mean()
-                
-                comparison_data.append({
-                    'Restaurant': rest_data['name'],
-                    'Revenue': total_rev,
-                    'Customers': total_cust,
-                    'AOV': total_rev / total_cust if total_cust > 0 else 0,
-                    'Avg Staff': avg_staff,
-                    'Color': rest_data['color']
-                })
+            # Comparison data for all restaurants (cached, misses as background jobs)
+            with profiler.stage('comparison forecast'):
+                all_forecasts = dict(zip(restaurants, collect(comparison_futures, "Forecasting restaurants").values()))
+                combined_forecast = stack_forecasts(all_forecasts)
+            # Seconds per restaurant; None means served from the cache
+            st.session_state.restaurant_timings = {
+                rest_key: jobs.timings.get(key) for rest_key, key in zip(restaurants, comparison_futures)
+            }
+            comparison_id = tuple(comparison_futures)
             
-            comparison_df = pd.DataFrame(comparison_data)
+            # Reconciled products add up to each restaurant's items and to the group total
+            comparison_df = SalesStore.from_stacked(combined_forecast).site_totals().rename(columns={
+                'site': 'restaurant', 'revenue': 'Revenue', 'customers': 'Customers',
+                'items': 'Items', 'staff': 'Avg Staff',
+            })
+            st.caption(
+                f"🏢 Group total: €{comparison_df['Revenue'].sum():,.0f} • "
+                f"{comparison_df['Customers'].sum():,} customers • {comparison_df['Items'].sum():,.0f} items"
+            )
+            comparison_df['AOV'] = (comparison_df['Revenue'] / comparison_df['Customers']).where(comparison_df['Customers'] > 0, 0)
+            comparison_df['Restaurant'] = comparison_df['restaurant'].map(lambda key: restaurants[key]['name'])
+            comparison_df['Color'] = comparison_df['restaurant'].map(lambda key: restaurants[key]['color'])
             
+            from charts import create_comparison_bar
             col1, col2 = st.columns(2)
             
             with col1:
                 st.subheader(f"Revenue Comparison ({st.session_state.forecast_days} days)")
-                fig_revenue = px.bar(
-                    comparison_df, 
-                    x='Restaurant', 
-                    y='Revenue',
-                    color='Restaurant',
-                    color_discrete_map={row['Restaurant']: row['Color'] for _, row in comparison_df.iterrows()}
+                fig_revenue = cached_figure(
+                    (comparison_id, 'revenue'),
+                    lambda: create_comparison_bar(comparison_df, 'Revenue')
                 )
-                fig_revenue.update_layout(showlegend=False, height=350)
                 st.plotly_chart(fig_revenue, use_container_width=True)
             
             with col2:
                 st.subheader("Average Staff Requirements")
-                fig_staff = px.bar(
-                    comparison_df, 
-                    x='Restaurant', 
-                    y='Avg Staff',
-                    color='Restaurant',
-                    color_discrete_map={row['Restaurant']: row['Color'] for _, row in comparison_df.iterrows()}
+                fig_staff = cached_figure(
+                    (comparison_id, 'staff'),
+                    lambda: create_comparison_bar(comparison_df, 'Avg Staff')
                 )
-                fig_staff.update_layout(showlegend=False, height=350)
                 st.plotly_chart(fig_staff, use_container_width=True)
             
             # Strategic Summary
@@ -843,6 +1116,17 @@ if forecast_data is not None and not forecast_data.empty:
                         <p style="color: {rest_data['color']}; font-size: 0.8rem;">Avg Staff: {comparison_df.iloc[i]['Avg Staff']:.1f}</p>
                     </div>
                     """, unsafe_allow_html=True)
+            
+            # Per-restaurant generation time for this rerun
+            with st.expander("⏱️ Forecast timing"):
+                timing_df = pd.DataFrame({
+                    'Restaurant': [restaurants[key]['name'] for key in st.session_state.restaurant_timings],
+                    'Time (ms)': [
+                        'cached' if seconds is None else f"{seconds * 1000:.1f}"
+                        for seconds in st.session_state.restaurant_timings.values()
+                    ]
+                })
+                st.dataframe(timing_df, hide_index=True, use_container_width=True)
 
 else:
     st.error("Unable to generate forecast data. Please check your input.")
@@ -886,4 +1170,72 @@ st.markdown(f"""
         </div>
     </div>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# Forecast cache panel - rendered last so the counters include this rerun
+with st.sidebar:
+    st.markdown("---")
+    with st.expander("🗄️ Forecast Cache"):
+        cache = st.session_state.forecast_cache
+        if st.button("Clear forecast cache"):
+            cache.clear()
+            st.session_state.figure_cache.clear()
+        stats = cache.stats()
+        st.markdown(f"**Hits:** {stats['hits']} • **Misses:** {stats['misses']} ({stats['hit_rate']:.0%} hit rate)")
+        st.markdown(f"**Entries:** {stats['entries']}/{cache.max_entries} • **Size:** {stats['bytes'] / 1024:.1f} KB")
+        shared = stats['shared']
+        st.markdown(
+            f"**Server:** {shared['entries']} entries ({shared['held']} in use) • "
+            f"{shared['bytes'] / (1024 * 1024):.1f} of {cache.max_bytes / (1024 * 1024):.0f} MB • "
+            f"{shared['sessions']} session(s)"
+        )
+        figures = st.session_state.figure_cache
+        st.markdown(f"**Figures:** {figures.hits} reused • {figures.patches} patched • {figures.builds} built")
+        st.markdown(
+            f"**Jobs:** {jobs.submitted} submitted • {jobs.cancelled} cancelled • "
+            f"{jobs.running()} running on {jobs.pool.workers} worker(s)"
+        )
+
+# Profiler panel - rendered last so the breakdown covers the whole rerun
+with st.sidebar:
+    with st.expander("🔬 Profiler"):
+        st.checkbox(
+            "Time dashboard stages",
+            value=PROFILE_BY_DEFAULT,
+            key='profiling_enabled',
+            help="Takes effect from the next rerun"
+        )
+        last_rerun = profiler.finish_rerun()
+        if last_rerun is None:
+            st.caption("Profiling is off.")
+        else:
+            st.markdown(f"**Rerun {last_rerun['rerun']}:** {last_rerun['total_ms']:.1f} ms")
+            st.dataframe(
+                pd.DataFrame({
+                    'Stage': [stage['name'] for stage in last_rerun['stages']],
+                    'Time (ms)': [round(stage['duration_ms'], 1) for stage in last_rerun['stages']],
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+            st.markdown(f"**Last {len(profiler.history)} reruns (ms)**")
+            st.line_chart(
+                pd.DataFrame({'total': [record['total_ms'] for record in profiler.history]},
+                             index=[record['rerun'] for record in profiler.history]),
+                height=150
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="📥 JSONL",
+                    data=profiler.to_jsonl(),
+                    file_name="dashboard_profile.jsonl",
+                    mime="application/x-ndjson"
+                )
+            with col2:
+                st.download_button(
+                    label="📥 Chrome trace",
+                    data=profiler.to_chrome_trace(),
+                    file_name="dashboard_trace.json",
+                    mime="application/json"
+                )
@@ -0,0 +1,162 @@
+"""Forecasts run as background jobs, so a rerun never waits on stale work.
+
+Streamlit reruns the script on every widget change and a rerun that blocks
+in a long forecast cannot be interrupted until it returns. Here the script
+submits the forecasts it needs to a worker pool shared by the process, draws
+what does not depend on them, and then waits in short steps: every step
+updates a status line, which is where Streamlit stops a run whose widgets
+changed.
+
+- Jobs are keyed like the forecasts they compute. Asking again for a key
+  that is queued, running or finished returns the same future, so a rerun
+  picks up the work an interrupted one started.
+- ``start_rerun()`` marks every job stale; submitting a key in the new rerun
+  wants it again. ``cancel_stale()`` then cancels stale jobs that have not
+  started and forgets finished ones. A running job cannot be interrupted:
+  it is left to finish (the app caches its result) but nothing waits on it.
+- The pool's size is a server setting (``MASLOW_JOB_WORKERS``). A session
+  limits its own concurrency with ``max_running``: jobs past the limit wait
+  on the session's board and are handed to the pool as earlier ones finish,
+  so one session neither resizes the pool nor fills it for everyone else.
+
+Jobs run off the script thread and must not call Streamlit.
+
+Plain Python, no Streamlit imports.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from forecast_executor import DEFAULT_WORKERS
+
+JOB_WORKERS = int(os.environ.get('MASLOW_JOB_WORKERS', DEFAULT_WORKERS))
+POLL_SECONDS = 0.1
+
+
+def completed(value):
+    """A future that is already done, for results served from a cache"""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class JobPool:
+    """Worker threads shared by every session"""
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='forecast-job')
+
+    def submit(self, fn, *args):
+        return self._executor.submit(fn, *args)
+
+
+class JobBoard:
+    """One session's background jobs, keyed like the forecasts they compute
+
+    At most ``max_running`` of the session's jobs are in the pool at once
+    (None: no limit); the others wait here in submission order.
+    """
+
+    def __init__(self, pool, max_running=None):
+        self.pool = pool
+        self.max_running = max_running
+        self.submitted = 0
+        self.cancelled = 0
+        # Seconds each job took, written by the worker when it finishes
+        self.timings = {}
+        self._jobs = {}
+        self._wanted = set()
+        self._queued = deque()
+        self._in_pool = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def start_rerun(self):
+        """Mark every job stale until this rerun asks for it again"""
+        self._wanted = set()
+
+    def submit(self, key, fn, *args):
+        """Future of ``fn(*args)`` for ``key``, reusing a job already submitted for it"""
+        self._wanted.add(key)
+        future = self._jobs.get(key)
+        if future is None or future.cancelled():
+            self.timings.pop(key, None)
+            # The board's own future: cancellable until the job starts, wherever it waits
+            future = self._jobs[key] = Future()
+            self.submitted += 1
+            with self._lock:
+                self._queued.append((key, future, fn, args))
+            self._start_queued()
+        return future
+
+    def _start_queued(self):
+        with self._lock:
+            while self._queued and (self.max_running is None or self._in_pool < self.max_running):
+                job = self._queued.popleft()
+                if job[1].cancelled():
+                    continue
+                self._in_pool += 1
+                self.pool.submit(self._run, *job)
+
+    def _run(self, key, future, fn, args):
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            started = time.perf_counter()
+            try:
+                result = fn(*args)
+            except BaseException as error:
+                future.set_exception(error)
+            else:
+                self.timings[key] = time.perf_counter() - started
+                future.set_result(result)
+        finally:
+            with self._lock:
+                self._in_pool -= 1
+            self._start_queued()
+
+    def cancel_stale(self):
+        """Cancel stale jobs that have not started and forget finished ones; returns the number cancelled"""
+        cancelled = 0
+        for key in [key for key in self._jobs if key not in self._wanted]:
+            future = self._jobs[key]
+            if future.cancel():
+                cancelled += 1
+            elif not future.done():
+                continue  # Running: kept, so asking for it again does not start it twice
+            del self._jobs[key]
+            self.timings.pop(key, None)
+        self.cancelled += cancelled
+        return cancelled
+
+    def cancel_all(self, wait_running=False):
+        """Cancel every job that has not started, optionally waiting for the running ones"""
+        self.start_rerun()
+        self.cancel_stale()
+        if wait_running:
+            wait(list(self._jobs.values()))
+            self.cancel_stale()
+
+    def running(self):
+        return sum(1 for future in self._jobs.values() if future.running())
+
+
+def wait_for(futures, poll=None, interval=POLL_SECONDS):
+    """Results of ``futures`` in order, calling ``poll(elapsed, done, total)`` every ``interval``
+
+    ``poll`` is where the caller yields: in the app it redraws a status line,
+    which lets Streamlit interrupt the run. A job's exception is raised here.
+    """
+    futures = list(futures)
+    pending = {future for future in futures if not future.done()}
+    started = time.perf_counter()
+    while pending:
+        if poll is not None:
+            poll(time.perf_counter() - started, len(futures) - len(pending), len(futures))
+        pending = wait(pending, timeout=interval, return_when=FIRST_COMPLETED).not_done
+    return [future.result() for future in futures]
@@ -0,0 +1,202 @@
+"""Rolling-origin backtests of the forecast models on uploaded history.
+
+Every day of the history from MIN_HISTORY_DAYS on is used as a forecast
+origin: the model is fit on the days before it and scored on the next
+``horizon`` days. The design matrix is built once for the whole history and
+the fit at each origin comes from running sums of X'X and X'Y, so an origin
+costs one small solve instead of a refit. Origins are scored in chunks, with
+each chunk's solves and predictions stacked into batched array operations;
+chunks run in a thread pool.
+
+Plain NumPy/pandas, no Streamlit imports.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import DEFAULT_MODEL, FORECAST_MODELS, get_product_columns
+from seasonal_model import (
+    DEFAULT_FOURIER_ORDER,
+    DEFAULT_RIDGE,
+    MIN_HISTORY_DAYS,
+    YEARLY_MIN_DAYS,
+    calendar_features,
+    n_features,
+)
+
+# Origins scored per batched solve
+CHUNK_ORIGINS = 64
+
+# Per (series, horizon) sums every accuracy metric is derived from
+_SUM_COLUMNS = ['origins', 'abs_error', 'error', 'actual', 'ape_sum', 'ape_count']
+
+
+def backtest_columns(history):
+    """Metric and product columns a backtest scores"""
+    metrics = ['revenue', 'customers'] + (['staff'] if 'staff' in history.columns else [])
+    return metrics + get_product_columns(history)
+
+
+def daily_values(history, columns):
+    """(calendar days, values) of ``columns`` with one row per day from the first to the last date
+
+    Days missing from the history are NaN rows, so row offsets are calendar
+    days like the forecast's horizon steps.
+    """
+    dates = pd.DatetimeIndex(pd.to_datetime(history['date'])).normalize()
+    calendar = pd.date_range(dates.min(), dates.max(), freq='D')
+    values = pd.DataFrame(history[columns].to_numpy(dtype=np.float64), index=dates)
+    if not dates.is_unique:
+        values = values.groupby(level=0).sum(min_count=1)
+    return calendar, values.reindex(calendar).to_numpy()
+
+
+def _accuracy(sums):
+    """MAPE, WAPE and bias (all in %) from summed errors"""
+    actual = sums['actual'].where(sums['actual'] != 0)
+    return sums.assign(
+        mape=100 * sums['ape_sum'] / sums['ape_count'].where(sums['ape_count'] > 0),
+        wape=100 * sums['abs_error'] / actual.abs(),
+        bias=100 * sums['error'] / actual,
+    )
+
+
+def _scored(observed, trained, origins, horizon):
+    """Target days of every origin and horizon step, and which of them are scored"""
+    days = origins[:, None] + np.arange(horizon)
+    valid = days < len(observed)
+    days = np.minimum(days, len(observed) - 1)
+    return days, valid[:, :, None] & observed[days] & trained[origins][:, None, :]
+
+
+def _seasonal_chunk(X, X_fit, Y, observed, trained, origins, horizon, ridge):
+    """Summed errors of seasonal fits at ``origins`` (consecutive days), shape (6, horizon, series)
+
+    The columns of ``Y`` are recorded on the same days, and ``X_fit`` is the
+    design matrix with the other days zeroed, so they do not enter the fit.
+    """
+    first, last = origins[0], origins[-1]
+
+    # X'X and X'Y at every origin: a running sum over the rows before it
+    row_xtx = np.einsum('ij,ik->ijk', X_fit[first:last], X_fit[first:last])
+    xtx = np.concatenate([(X_fit[:first].T @ X_fit[:first])[None], row_xtx]).cumsum(axis=0)
+    row_xty = np.einsum('ij,ik->ijk', X_fit[first:last], Y[first:last])
+    xty = np.concatenate([(X_fit[:first].T @ Y[:first])[None], row_xty]).cumsum(axis=0)
+
+    # Origins fit on less than a year leave out the yearly terms, like SeasonalModel.fit
+    features = n_features(DEFAULT_FOURIER_ORDER) if first >= YEARLY_MIN_DAYS else n_features(0)
+    xtx, xty = xtx[:, :features, :features], xty[:, :features]
+    penalty = np.full(features, float(ridge))
+    penalty[0] = 0.0  # the intercept is not shrunk
+    # Origins with too few recorded days are not scored; keep their solve regular
+    xtx[~trained[origins, 0]] += np.eye(features)
+    coef = np.linalg.solve(xtx + np.diag(penalty), xty)
+
+    # Predictions for every origin and horizon step at once
+    days, valid = _scored(observed, trained, origins, horizon)
+    predicted = X[days][:, :, :features] @ coef
+    return _error_sums(np.rint(np.maximum(predicted, 0)), Y[days], valid)
+
+
+def _baseline_chunk(Y, observed, trained, cumulative_y, cumulative_days, origins, horizon):
+    """Summed errors of the history-mean model without its random variation"""
+    days, valid = _scored(observed, trained, origins, horizon)
+    recorded = cumulative_days[origins]
+    means = np.divide(cumulative_y[origins], recorded, out=np.zeros_like(cumulative_y[origins]), where=recorded > 0)
+    trend = 1.0 + 0.1 * np.sin(2 * np.pi * np.arange(horizon) / 365)
+    predicted = means[:, None, :] * trend[None, :, None]
+    return _error_sums(np.trunc(predicted), Y[days], valid)
+
+
+def _error_sums(predicted, actual, valid):
+    """Sum errors over the scored origins for each horizon step and series"""
+    actual = actual * valid
+    error = predicted - actual
+    error *= valid
+    abs_error = np.abs(error)
+    nonzero = actual != 0
+    ape = np.divide(abs_error, np.abs(actual), out=np.zeros_like(abs_error), where=nonzero)
+    return np.stack([
+        valid.sum(axis=0),
+        abs_error.sum(axis=0),
+        error.sum(axis=0),
+        actual.sum(axis=0),
+        ape.sum(axis=0),
+        nonzero.sum(axis=0),
+    ])
+
+
+def rolling_origin_backtest(history, horizon, model=DEFAULT_MODEL, columns=None,
+                            min_train_days=MIN_HISTORY_DAYS, ridge=DEFAULT_RIDGE, workers=1):
+    """Score ``model`` at every origin and horizon step up to ``horizon``
+
+    Origins and horizon steps are calendar days. Returns one row per (series,
+    horizon step) with the number of scored origins, the summed errors and
+    MAPE/WAPE/bias in percent. Days a series was not recorded are neither
+    fit nor scored, and an origin is scored for a series once it has
+    ``min_train_days`` recorded days before it; a series without such an
+    origin gets NaN accuracy.
+    """
+    if model not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model {model!r}, expected one of {FORECAST_MODELS}")
+    if columns is None:
+        columns = backtest_columns(history)
+    calendar, Y = daily_values(history, columns)
+    observed = np.isfinite(Y)
+    Y = np.where(observed, Y, 0.0)
+    # Recorded days before each day, per series
+    cumulative_days = np.concatenate([np.zeros((1, Y.shape[1])), observed.cumsum(axis=0)])
+    trained = cumulative_days[:-1] >= min_train_days
+
+    origins = np.arange(min_train_days, len(Y))
+    if len(origins) == 0:
+        raise ValueError(f"Backtests need more than {min_train_days} days of history")
+
+    # A chunk never straddles the switch to yearly terms
+    boundaries = [start for start in range(origins[0], len(Y), CHUNK_ORIGINS)]
+    if origins[0] < YEARLY_MIN_DAYS < len(Y):
+        boundaries = sorted(set(boundaries) | {YEARLY_MIN_DAYS})
+    chunks = [np.arange(start, end) for start, end in zip(boundaries, boundaries[1:] + [len(Y)])]
+
+    if model == 'seasonal':
+        X = calendar_features(calendar, calendar[0], DEFAULT_FOURIER_ORDER)
+        # Columns recorded on the same days share one fit per origin
+        patterns = {}
+        for col in range(Y.shape[1]):
+            patterns.setdefault(observed[:, col].tobytes(), []).append(col)
+        groups = list(patterns.values())
+        fit_matrices = [X if observed[:, group[0]].all() else X * observed[:, group[0], None] for group in groups]
+
+        def score(chunk):
+            sums = np.empty((len(_SUM_COLUMNS), horizon, Y.shape[1]))
+            for group, X_fit in zip(groups, fit_matrices):
+                sums[:, :, group] = _seasonal_chunk(
+                    X, X_fit, Y[:, group], observed[:, group], trained[:, group], chunk, horizon, ridge
+                )
+            return sums
+    else:
+        cumulative_y = np.concatenate([np.zeros((1, Y.shape[1])), Y.cumsum(axis=0)])
+        score = lambda chunk: _baseline_chunk(  # noqa: E731
+            Y, observed, trained, cumulative_y, cumulative_days, chunk, horizon
+        )
+
+    if workers > 1 and len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            sums = sum(executor.map(score, chunks))
+    else:
+        sums = sum(score(chunk) for chunk in chunks)
+
+    frame = pd.DataFrame({
+        'series': np.repeat(columns, horizon),
+        'horizon': np.tile(np.arange(1, horizon + 1), len(columns)),
+        **{name: sums[i].T.ravel() for i, name in enumerate(_SUM_COLUMNS)},
+    })
+    frame['origins'] = frame['origins'].astype(np.int64)
+    return _accuracy(frame)
+
+
+def backtest_summary(results):
+    """Accuracy per series, pooled over every horizon step"""
+    pooled = results.groupby('series', sort=False)[_SUM_COLUMNS].sum().reset_index()
+    return _accuracy(pooled)[['series', 'origins', 'mape', 'wape', 'bias']]
@@ -0,0 +1,65 @@
+"""Benchmark the batched seasonal fit against fitting one model per product.
+
+Usage:
+    python benchmarks/bench_batched_fit.py [--history-days 730] [--horizon 30] [--repeat 3]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_forecast_engine import make_history  # noqa: E402
+from forecast_engine import get_product_columns  # noqa: E402
+from seasonal_model import SeasonalModel  # noqa: E402
+
+PRODUCT_COUNTS = [10, 100, 300, 1000]
+
+
+def per_product_fit(dates, values, forecast_dates):
+    """One model, one X'X and one solve per product column"""
+    return [
+        SeasonalModel.fit(dates, values[:, i]).predict(forecast_dates)
+        for i in range(values.shape[1])
+    ]
+
+
+def batched_fit(dates, values, forecast_dates):
+    """Every product column in one model: a shared X'X and a single solve"""
+    return SeasonalModel.fit(dates, values).predict(forecast_dates)
+
+
+def best_time(func, repeat):
+    """Best wall time of one call, in seconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history-days', type=int, default=730)
+    parser.add_argument('--horizon', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'per-product (ms)':>17} {'batched (ms)':>13} {'speedup':>9}")
+    for n_products in PRODUCT_COUNTS:
+        history = make_history(args.history_days, n_products)
+        dates = pd.to_datetime(history['date'])
+        values = history[get_product_columns(history)].to_numpy(dtype=np.float64)
+        forecast_dates = pd.date_range(dates.max() + pd.Timedelta(days=1), periods=args.horizon, freq='D')
+
+        # Both paths must agree before their timings mean anything
+        single = np.stack([np.column_stack(p) for p in zip(*per_product_fit(dates, values, forecast_dates))])
+        assert np.allclose(single, np.stack(batched_fit(dates, values, forecast_dates)))
+
+        loop = best_time(lambda: per_product_fit(dates, values, forecast_dates), args.repeat)
+        batch = best_time(lambda: batched_fit(dates, values, forecast_dates), args.repeat)
+        print(f"{n_products:>9} {loop * 1e3:>17.1f} {batch * 1e3:>13.2f} {loop / batch:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark the vectorized forecast engine against the original per-day loop.
+
+Both sides run the baseline (history mean) model the loop implemented.
+
+Usage:
+    python benchmarks/bench_forecast_engine.py [--history-days 365] [--repeat 3]
+"""
+import argparse
+import math
+import sys
+import timeit
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from forecast_engine import forecast_from_history  # noqa: E402
+
+HORIZONS = [7, 90, 365]
+PRODUCT_COUNTS = [10, 100, 1000]
+
+
+def legacy_forecast_from_data(uploaded_data, days_ahead):
+    """The per-day loop generate_forecast_from_data used before the engine"""
+    uploaded_data['date'] = pd.to_datetime(uploaded_data['date'])
+    uploaded_data = uploaded_data.sort_values('date')
+
+    avg_revenue = uploaded_data['revenue'].mean()
+    avg_customers = uploaded_data['customers'].mean()
+
+    forecast_data = []
+    last_date = uploaded_data['date'].max()
+
+    for i in range(days_ahead):
+        forecast_date = last_date + timedelta(days=i+1)
+
+        trend_factor = 1.0 + (0.1 * math.sin(2 * math.pi * i / 365))
+        random_factor = 0.9 + np.random.random() * 0.2
+
+        forecasted_revenue = int(avg_revenue * trend_factor * random_factor)
+        forecasted_customers = int(avg_customers * trend_factor * random_factor)
+
+        if 'staff' in uploaded_data.columns:
+            avg_staff = uploaded_data['staff'].mean()
+            forecasted_staff = max(3, int(avg_staff * trend_factor * random_factor))
+        else:
+            forecasted_staff = max(3, math.ceil(forecasted_customers * 0.1))
+
+        forecast_row = {
+            'date': forecast_date.strftime('%b %d'),
+            'full_date': forecast_date.strftime('%Y-%m-%d'),
+            'revenue': forecasted_revenue,
+            'customers': forecasted_customers,
+            'staff_needed': forecasted_staff,
+            'day_of_week': forecast_date.strftime('%A')
+        }
+
+        product_columns = [col for col in uploaded_data.columns if col not in ['date', 'revenue', 'customers', 'staff']]
+        for product in product_columns:
+            if uploaded_data[product].dtype in ['int64', 'float64']:
+                avg_product = uploaded_data[product].mean()
+                forecast_row[product] = int(avg_product * trend_factor * random_factor)
+
+        forecast_data.append(forecast_row)
+
+    return pd.DataFrame(forecast_data)
+
+
+def make_history(history_days, n_products, seed=0):
+    """Synthetic daily history shaped like an uploaded POS export"""
+    rng = np.random.default_rng(seed)
+    history = {
+        'date': pd.date_range('2024-01-01', periods=history_days, freq='D').strftime('%Y-%m-%d'),
+        'revenue': rng.integers(800, 1600, history_days),
+        'customers': rng.integers(40, 120, history_days),
+        'staff': rng.integers(5, 12, history_days),
+    }
+    for p in range(n_products):
+        history[f'Product {p}'] = rng.integers(0, 60, history_days)
+    return pd.DataFrame(history)
+
+
+def best_time(func, repeat):
+    """Best wall time of one call, in seconds"""
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--history-days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'products':>9} {'loop (ms)':>11} {'engine (ms)':>12} {'speedup':>9}")
+    for n_products in PRODUCT_COUNTS:
+        history = make_history(args.history_days, n_products)
+        for days in HORIZONS:
+            loop = best_time(lambda: legacy_forecast_from_data(history.copy(), days), args.repeat)
+            engine = best_time(lambda: forecast_from_history(history, days, model='baseline'), args.repeat)
+            print(f"{days:>6} {n_products:>9} {loop * 1e3:>11.1f} {engine * 1e3:>12.2f} {loop / engine:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
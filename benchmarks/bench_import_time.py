@@ -0,0 +1,106 @@
+"""Report what importing the app's modules costs before the first page renders.
+
+Each module is imported in a fresh interpreter with ``python -X importtime``
+so nothing is already cached, and the cumulative time of the module and of
+its slowest dependencies is printed. ``--after streamlit`` imports streamlit
+(and everything it pulls in) before the clock starts, which shows what each
+module adds to an app that is already running. ``--app`` also times a cold first run
+of the whole dashboard and lists which heavy libraries it loaded.
+
+Usage:
+    python benchmarks/bench_import_time.py [--top 10] [--repeat 3] [--app]
+    python benchmarks/bench_import_time.py --after streamlit
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+MODULES = [
+    'streamlit',
+    'plotly.graph_objects',
+    'plotly.express',
+    'xlsxwriter',
+    'forecast_engine',
+    'charts',
+    'exports',
+    'figure_cache',
+    'reconciliation',
+]
+
+# Loaded only when a chart or an export is first drawn / requested
+DEFERRED = ['plotly.express', 'xlsxwriter', 'charts']
+
+APP_RUN = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+AppTest.from_file({app!r}, default_timeout=300).run()
+print('seconds', time.perf_counter() - start)
+print('loaded', *[name for name in {deferred!r} if name in sys.modules])
+"""
+MARKER = '-- import starts --'
+
+
+def import_times(module, after=()):
+    """(total, {package: cumulative}) microseconds of ``import module`` in a fresh interpreter
+
+    Modules the interpreter loads at startup (site, encodings) and the
+    ``after`` modules imported before the clock starts are left out.
+    """
+    preload = ''.join(f'import {name}; ' for name in after)
+    code = f"import sys; {preload}print({MARKER!r}, file=sys.stderr, flush=True); import {module}"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=REPO_DIR, capture_output=True, text=True, check=True
+    )
+    lines = result.stderr.splitlines()
+    total, packages = 0, {}
+    for line in lines[lines.index(MARKER) + 1:]:
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            total += int(cumulative)
+        if '.' not in name:
+            packages[name.strip()] = max(packages.get(name.strip(), 0), int(cumulative))
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modules', nargs='+', default=MODULES)
+    parser.add_argument('--after', nargs='*', default=[], help='modules imported before timing starts')
+    parser.add_argument('--top', type=int, default=5, help='slowest dependencies listed per module')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--app', action='store_true', help='also time a cold first run of app.py')
+    args = parser.parse_args()
+
+    for module in args.modules:
+        # Best of several runs: the first one also pays for cold .pyc and disk caches
+        total, packages = min(import_times(module, args.after) for _ in range(args.repeat))
+        print(f"{module:<24} {total / 1e3:>9.1f} ms")
+        slowest = sorted(((us, name) for name, us in packages.items() if name != module), reverse=True)
+        for us, name in slowest[:args.top]:
+            print(f"    {name:<28} {us / 1e3:>9.1f} ms")
+
+    if args.app:
+        result = subprocess.run(
+            [sys.executable, '-c', APP_RUN.format(app=str(REPO_DIR / 'app.py'), deferred=DEFERRED)],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        )
+        report = dict(
+            line.partition(' ')[::2] for line in result.stdout.splitlines()
+            if line.startswith(('seconds', 'loaded'))
+        )
+        print(f"\napp.py cold first run   {float(report['seconds']):>9.2f} s")
+        print(f"deferred modules loaded: {report['loaded'].strip() or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+"""Benchmark suite for the dashboard's hot paths.
+
+Times forecasting, backtests, staffing, chart building, the data table, upload
+parsing and exports over sweeps of horizon length, product count and history
+size, and reports p50/p95 wall time and peak traced memory per case as JSON.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --only forecast --horizons 7 90
+    python benchmarks/run_benchmarks.py --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from functools import cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from background_jobs import JobBoard, JobPool, wait_for  # noqa: E402
+from backtest import rolling_origin_backtest  # noqa: E402
+from bench_forecast_engine import make_history  # noqa: E402
+from columnar_store import ColumnarStore  # noqa: E402
+from charts import create_forecast_charts, create_product_forecast_chart, update_product_forecast_chart  # noqa: E402
+from data_table import format_page, row_positions, table_columns  # noqa: E402
+from exports import forecast_to_csv, forecast_to_excel  # noqa: E402
+from forecast_engine import (  # noqa: E402
+    calculate_staff_requirement,
+    FORECAST_MODELS,
+    forecast_from_history,
+    get_product_columns,
+    restaurants,
+    synthetic_forecast,
+    synthetic_forecast_frames,
+)
+from history_index import HistoryIndex  # noqa: E402
+from ingestion import append_delta, load_snapshot, optimize_frame, parse_upload, save_snapshot  # noqa: E402
+from reconciliation import RECONCILIATION_METHODS, Hierarchy  # noqa: E402
+from sales_store import SalesStore  # noqa: E402
+from shared_cache import SharedCache  # noqa: E402
+
+SAMPLE_FILE = REPO_DIR / 'cleaned_sales_data_maslow.xlsx'
+DEFAULT_HORIZONS = [1, 7, 30, 90, 365]
+DEFAULT_PRODUCTS = [5, 50, 200]
+DEFAULT_HISTORY_DAYS = [90, 365, 1095]
+BACKTEST_MAX_HORIZON = 90
+RECONCILE_SITES = 10
+SHARED_SESSIONS = 10
+# Products picked in the product chart's selector by default
+SHOWN_PRODUCTS = 10
+# One worker, so the switched-to forecast waits behind whatever was not cancelled
+JOB_POOL = JobPool(1)
+
+
+def shared_forecast_sessions(days, sessions=SHARED_SESSIONS):
+    """Every session asks the shared cache for the same restaurant forecast"""
+    shared = SharedCache()
+    views = [shared.open_session() for _ in range(sessions)]
+    return [
+        view.get_or_compute(('maslow', days), lambda: synthetic_forecast_frames(['maslow'], days)['maslow'])
+        for view in views
+    ]
+
+
+def switched_rerun(days, background):
+    """A rerun asks for every restaurant's forecast, then the manager switches period before it is drawn
+
+    Returns the switched-to forecast. Blocking reruns finish the stale
+    forecasts first; background jobs that have not started are cancelled.
+    """
+    def forecast(rest_key, horizon):
+        return synthetic_forecast_frames([rest_key], horizon)[rest_key]
+
+    if not background:
+        for rest_key in restaurants:
+            forecast(rest_key, days)
+        return forecast('maslow', days + 1)
+    board = JobBoard(JOB_POOL)
+    board.start_rerun()
+    for rest_key in restaurants:
+        board.submit((rest_key, days), forecast, rest_key, days)
+    board.start_rerun()
+    switched = board.submit(('maslow', days + 1), forecast, 'maslow', days + 1)
+    board.cancel_stale()
+    return wait_for([switched])[0]
+
+
+def benchmark_cases(args, workdir):
+    """Yield (name, params, setup) for every case of the sweep
+
+    ``setup()`` builds the case's inputs and returns the function to time.
+    Inputs shared by several cases are built once, by the first case that
+    needs them, so running a few cases with ``--only`` builds only theirs.
+    """
+    default_history = max(args.history_days)
+
+    @cache
+    def history(days, products):
+        return make_history(days, products)
+
+    @cache
+    def forecast(products, horizon):
+        return forecast_from_history(history(default_history, products), horizon)
+
+    @cache
+    def optimized(days, products):
+        return optimize_frame(history(days, products))
+
+    @cache
+    def snapshot(days, products):
+        digest = f'bench-{days}-{products}'
+        save_snapshot(optimized(days, products), digest, workdir)
+        return digest
+
+    @cache
+    def columnar(days, products):
+        store = ColumnarStore(Path(workdir) / 'columnar')
+        digest = f'bench-{days}-{products}'
+        store.write(digest, optimized(days, products))
+        return store, digest
+
+    @cache
+    def index(days, products):
+        return HistoryIndex.from_history(history(days, products))
+
+    @cache
+    def hierarchy(products):
+        return Hierarchy({f'site {i}': [f'product {j}' for j in range(products)] for i in range(RECONCILE_SITES)})
+
+    def customers(days):
+        return np.random.default_rng(0).integers(20, 200, days)
+
+    sweep = [(days, products) for days in args.history_days for products in args.products]
+
+    for history_days, products in sweep:
+        for horizon in args.horizons:
+            for model in FORECAST_MODELS:
+                yield ('forecast_from_history',
+                       {'horizon': horizon, 'products': products, 'history_days': history_days, 'model': model},
+                       lambda k=(history_days, products), d=horizon, m=model:
+                           lambda h=history(*k): forecast_from_history(h, d, model=m))
+
+    for horizon in args.horizons:
+        yield ('synthetic_forecast_frames',
+               {'horizon': horizon, 'restaurants': len(restaurants)},
+               lambda d=horizon: lambda: synthetic_forecast_frames(list(restaurants), d))
+        yield ('synthetic_forecast',
+               {'horizon': horizon, 'restaurants': len(restaurants)},
+               lambda d=horizon: lambda: synthetic_forecast(list(restaurants), d))
+        # Peak memory stays that of one forecast however many sessions ask for it
+        yield ('shared_cache_sessions',
+               {'horizon': horizon, 'sessions': SHARED_SESSIONS},
+               lambda d=horizon: lambda: shared_forecast_sessions(d))
+        for background in (False, True):
+            yield ('switched_rerun',
+                   {'horizon': horizon, 'restaurants': len(restaurants), 'background': background},
+                   lambda d=horizon, b=background: lambda: switched_rerun(d, b))
+
+        yield ('calculate_staff_requirement',
+               {'horizon': horizon, 'vectorized': True},
+               lambda d=horizon: lambda c=customers(d): calculate_staff_requirement(c, 'maslow'))
+        yield ('calculate_staff_requirement',
+               {'horizon': horizon, 'vectorized': False},
+               lambda d=horizon: lambda c=customers(d).tolist(): [calculate_staff_requirement(x, 'maslow') for x in c])
+
+    for products in args.products:
+        for horizon in args.horizons:
+            params = {'horizon': horizon, 'products': products}
+            k = (products, horizon)
+            yield ('create_forecast_charts', params,
+                   lambda k=k: lambda f=forecast(*k): create_forecast_charts(f, '#FF8C00'))
+            yield ('create_forecast_charts', {**params, 'history_days': default_history},
+                   lambda k=k: lambda f=forecast(*k), h=history(default_history, k[0]):
+                       create_forecast_charts(f, '#FF8C00', history=h))
+            yield ('create_product_forecast_chart', params,
+                   lambda k=k: lambda f=forecast(*k), p=get_product_columns(history(default_history, k[0])):
+                       create_product_forecast_chart(f, p, '#FF8C00'))
+
+            # Moving a selection of SHOWN_PRODUCTS along by one: rebuilt, and patched in place
+            def selections(k=k):
+                shown = get_product_columns(history(default_history, k[0]))[:SHOWN_PRODUCTS + 1]
+                return itertools.cycle([shown[:-1], shown[1:]])
+            yield ('create_product_forecast_chart', {**params, 'shown': SHOWN_PRODUCTS},
+                   lambda k=k: lambda f=forecast(*k), s=selections(k):
+                       create_product_forecast_chart(f, next(s), '#FF8C00'))
+
+            def patch_selection(k=k):
+                frame, shown = forecast(*k), selections(k)
+                fig = create_product_forecast_chart(frame, next(shown), '#FF8C00')
+                return lambda: update_product_forecast_chart(fig, frame, next(shown))
+            yield ('update_product_forecast_chart', {**params, 'shown': SHOWN_PRODUCTS}, patch_selection)
+
+            def table_page(k=k):
+                frame = forecast(*k)
+                columns = table_columns(frame, get_product_columns(history(default_history, k[0])))
+                return lambda: format_page(frame, row_positions(frame, 'revenue', True), columns, 1, 50)
+            yield ('detailed_table_page', params, table_page)
+            yield ('forecast_to_csv', params, lambda k=k: lambda f=forecast(*k): forecast_to_csv(f))
+            yield ('forecast_to_excel', params, lambda k=k: lambda f=forecast(*k): forecast_to_excel(f))
+            # Every origin of the history is scored, so long horizons are left out
+            if horizon <= BACKTEST_MAX_HORIZON:
+                yield ('rolling_origin_backtest', {**params, 'history_days': default_history},
+                       lambda k=k: lambda h=history(default_history, k[0]), d=k[1]: rolling_origin_backtest(h, d))
+
+    # Every product of every site against the site and group totals
+    for products in args.products:
+        for horizon in args.horizons:
+            for method in RECONCILIATION_METHODS:
+                def reconcile(products=products, days=horizon, method=method):
+                    h = hierarchy(products)
+                    base = np.random.default_rng(0).random((days, h.n_nodes))
+                    return lambda: h.reconcile(base, method)
+                yield ('reconcile',
+                       {'horizon': horizon, 'products': products, 'sites': RECONCILE_SITES, 'method': method},
+                       reconcile)
+
+    if SAMPLE_FILE.exists():
+        yield ('parse_upload_xlsx', {'file': SAMPLE_FILE.name, 'bytes': SAMPLE_FILE.stat().st_size},
+               lambda: lambda b=SAMPLE_FILE.read_bytes(): optimize_frame(parse_upload(SAMPLE_FILE.name, b)))
+
+    for history_days, products in sweep:
+        params = {'history_days': history_days, 'products': products}
+        k = (history_days, products)
+        yield ('parse_upload_csv', params,
+               lambda k=k: lambda b=history(*k).to_csv(index=False).encode():
+                   optimize_frame(parse_upload('upload.csv', b)))
+        yield ('load_snapshot', params, lambda k=k: lambda d=snapshot(*k): load_snapshot(d, workdir))
+
+        # The same history from memory-mapped columns: whole, and the last 8 weeks
+        yield ('columnar_history', params, lambda k=k: lambda c=columnar(*k): c[0].history(c[1]))
+
+        def columnar_recent(k=k):
+            store, digest = columnar(*k)
+            recent = pd.to_datetime(history(*k)['date']).max() - pd.Timedelta(days=55)
+            return lambda: store.history(digest, start=recent)
+        yield ('columnar_history_last_days', params, columnar_recent)
+
+        # A daily refresh: the last week arrives as a delta file
+        def delta(k=k):
+            stored = optimized(*k).iloc[:-7]
+            delta_bytes = history(*k).iloc[-7:].to_csv(index=False).encode()
+            return lambda: append_delta(stored, 'bench', 'delta.csv', delta_bytes, snapshot_dir=workdir)
+        yield ('append_delta', params, delta)
+        yield ('sales_store_from_wide', params,
+               lambda k=k: lambda h=history(*k): SalesStore.from_wide(h, 'bench'))
+
+        # Dashboard-style lookups: one product over the last 8 weeks, trailing 28-day sums
+        def lookup_columns(k):
+            return ['revenue', get_product_columns(history(*k))[0]]
+        yield ('history_index_last_days', params,
+               lambda k=k: lambda i=index(*k), c=lookup_columns(k): i.last_days(days=56, columns=c))
+        yield ('history_index_rolling_sum', params,
+               lambda k=k: lambda i=index(*k), c=lookup_columns(k):
+                   i.rolling_sum(window=28, start=i.last_date() - 55, columns=c))
+
+
+def measure(func, repeat, warmup=1):
+    """Wall times (ms) of ``repeat`` calls and the peak traced memory (KiB) of one more"""
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+
+    # Tracing slows allocation down, so memory gets its own untimed run
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'p50_ms': float(np.percentile(times, 50)),
+        'p95_ms': float(np.percentile(times, 95)),
+        'min_ms': float(np.min(times)),
+        'peak_kib': peak / 1024,
+        'repeat': repeat,
+    }
+
+
+def case_id(result):
+    return result['name'] + json.dumps(result['params'], sort_keys=True)
+
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Cases whose p50 grew by more than ``tolerance`` relative to the baseline"""
+    baseline_by_id = {case_id(result): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        previous = baseline_by_id.get(case_id(result))
+        if previous is None or previous['p50_ms'] <= 0:
+            continue
+        ratio = result['p50_ms'] / previous['p50_ms']
+        if ratio > 1 + tolerance:
+            regressions.append({
+                'name': result['name'],
+                'params': result['params'],
+                'baseline_p50_ms': previous['p50_ms'],
+                'p50_ms': result['p50_ms'],
+                'ratio': ratio,
+            })
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's hot paths")
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--horizons', nargs='+', type=int, default=DEFAULT_HORIZONS)
+    parser.add_argument('--products', nargs='+', type=int, default=DEFAULT_PRODUCTS)
+    parser.add_argument('--history-days', nargs='+', type=int, default=DEFAULT_HISTORY_DAYS)
+    parser.add_argument('--only', default=None, help="run only cases whose name contains this text")
+    parser.add_argument('--output', type=Path, default=None, help="write the JSON report here (default: stdout)")
+    parser.add_argument('--baseline', type=Path, default=None, help="JSON report to check for regressions against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed relative p50 slowdown before a case counts as a regression")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, params, setup in benchmark_cases(args, workdir):
+            if args.only and args.only not in name:
+                continue
+            stats = measure(setup(), args.repeat)
+            results.append({'name': name, 'params': params, **stats})
+            print(f"{name:<30} {json.dumps(params):<70} p50 {stats['p50_ms']:9.2f} ms  "
+                  f"p95 {stats['p95_ms']:9.2f} ms  peak {stats['peak_kib']:10.1f} KiB", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+    exit_code = 0
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text())
+        regressions = compare_with_baseline(results, baseline, args.tolerance)
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression['name']} {json.dumps(regression['params'])}: "
+                  f"{regression['baseline_p50_ms']:.2f} -> {regression['p50_ms']:.2f} ms "
+                  f"({regression['ratio']:.2f}x)", file=sys.stderr)
+        exit_code = 1 if regressions else 0
+
+    report_json = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(report_json)
+    else:
+        print(report_json)
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,287 @@
+"""Plotly figure builders for the dashboard (no Streamlit imports).
+
+Lines are downsampled with LTTB to MAX_DISPLAY_POINTS before they are added
+to a figure, and figures with more than WEBGL_POINTS points are drawn with
+Scattergl, so long histories and large menus stay small in the browser.
+Passing a zoom ``window`` downsamples only the visible range: zooming in far
+enough shows the data at full resolution.
+
+Only plotly.graph_objects is used: plotly.express takes longer to import
+than the rest of this module, and the app imports this module only when it
+first draws a chart.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+from downsample import lttb_indices
+
+# Points kept per line after downsampling
+MAX_DISPLAY_POINTS = 1000
+
+# Figures with more points than this switch to WebGL traces without markers
+WEBGL_POINTS = 2000
+
+HISTORY_COLOR = '#9E9E9E'
+
+def _days(dates):
+    """Dates as float days since the first one, the x values LTTB works on"""
+    return ((dates - dates.min()) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+
+
+def _in_window(frame, dates, window):
+    """Rows of ``frame`` (and their dates) inside a (start, end) window"""
+    if window is None:
+        return frame, dates
+    inside = ((dates >= pd.Timestamp(window[0])) & (dates <= pd.Timestamp(window[1]))).to_numpy()
+    return frame[inside], dates[inside]
+
+
+def _scatter_class(points):
+    return go.Scattergl if points > WEBGL_POINTS else go.Scatter
+
+
+def _line(scatter, dates, values, **kwargs):
+    """Line trace of ``values`` over ``dates``, downsampled for display"""
+    values = np.asarray(values)
+    keep = lttb_indices(_days(dates), values, MAX_DISPLAY_POINTS) if len(values) else slice(None)
+    kwargs.setdefault('mode', 'lines+markers' if scatter is go.Scatter else 'lines')
+    return scatter(x=dates.to_numpy()[keep], y=values[keep], **kwargs)
+
+
+def figure_payload(fig):
+    """(JSON bytes, plotted points) of a figure as it is sent to the browser"""
+    points = sum(len(trace.x) for trace in fig.data if trace.x is not None)
+    return len(pio.to_json(fig, validate=False)), points
+
+
+def add_interval_band(fig, scatter, forecast_data, dates, column, color, row, col):
+    """Shade the ``{column}_lower``..``{column}_upper`` prediction interval, if the forecast has one"""
+    lower, upper = f'{column}_lower', f'{column}_upper'
+    if lower not in forecast_data.columns or upper not in forecast_data.columns:
+        return
+    fig.add_trace(
+        _line(scatter, dates, forecast_data[upper],
+              mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False),
+        row=row, col=col
+    )
+    fig.add_trace(
+        _line(scatter, dates, forecast_data[lower],
+              mode='lines', line=dict(width=0), fill='tonexty', fillcolor=color,
+              opacity=0.2, name='Prediction interval', hoverinfo='skip', showlegend=False),
+        row=row, col=col
+    )
+
+
+def create_forecast_charts(forecast_data, restaurant_color, history=None, window=None):
+    """Create comprehensive forecast charts
+
+    ``history`` (an uploaded frame with date, revenue, customers and
+    optionally staff) is drawn behind the forecast; ``window`` is a
+    (start, end) pair of dates to zoom into.
+    """
+    forecast_data, dates = _in_window(forecast_data, pd.to_datetime(forecast_data['full_date']), window)
+    history_metrics = []
+    if history is not None:
+        history, history_dates = _in_window(history, pd.to_datetime(history['date']), window)
+        history_metrics = [col for col in ('revenue', 'customers', 'staff') if col in history.columns]
+
+    # Forecast lines, interval bands and the scatter, plus the history lines
+    history_points = min(len(history), MAX_DISPLAY_POINTS) if history_metrics else 0
+    points = 7 * min(len(forecast_data), MAX_DISPLAY_POINTS) + len(history_metrics) * history_points
+    scatter = _scatter_class(points)
+    
+    # Main metrics chart
+    fig_main = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Revenue Forecast', 'Customer Forecast', 'Staff Requirements', 'Revenue vs Customers'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    )
+    
+    # History behind the forecast
+    for metric, (row, col) in zip(history_metrics, [(1, 1), (1, 2), (2, 1)]):
+        fig_main.add_trace(
+            _line(scatter, history_dates, history[metric], mode='lines', name=f'Actual {metric}',
+                  line=dict(color=HISTORY_COLOR, width=1)),
+            row=row, col=col
+        )
+    
+    # Revenue
+    add_interval_band(fig_main, scatter, forecast_data, dates, 'revenue', restaurant_color, row=1, col=1)
+    fig_main.add_trace(
+        _line(scatter, dates, forecast_data['revenue'], name='Revenue',
+              line=dict(color=restaurant_color, width=3)),
+        row=1, col=1
+    )
+    
+    # Customers
+    add_interval_band(fig_main, scatter, forecast_data, dates, 'customers', '#1f77b4', row=1, col=2)
+    fig_main.add_trace(
+        _line(scatter, dates, forecast_data['customers'], name='Customers',
+              line=dict(color='#1f77b4', width=3)),
+        row=1, col=2
+    )
+    
+    # Staff
+    fig_main.add_trace(
+        _line(scatter, dates, forecast_data['staff_needed'], name='Staff Needed',
+              line=dict(color='#ff7f0e', width=3)),
+        row=2, col=1
+    )
+    
+    # Revenue vs Customers scatter
+    fig_main.add_trace(
+        scatter(x=forecast_data['customers'], y=forecast_data['revenue'],
+                  mode='markers', name='Revenue vs Customers',
+                  marker=dict(color=restaurant_color, size=8)),
+        row=2, col=2
+    )
+    
+    fig_main.update_layout(height=600, showlegend=False, title_text="Key Metrics Forecast")
+    fig_main.update_xaxes(title_text="Date", row=1, col=1)
+    fig_main.update_xaxes(title_text="Date", row=1, col=2)
+    fig_main.update_xaxes(title_text="Date", row=2, col=1)
+    fig_main.update_xaxes(title_text="Customers", row=2, col=2)
+    fig_main.update_yaxes(title_text="Revenue (€)", row=1, col=1)
+    fig_main.update_yaxes(title_text="Customers", row=1, col=2)
+    fig_main.update_yaxes(title_text="Staff Count", row=2, col=1)
+    fig_main.update_yaxes(title_text="Revenue (€)", row=2, col=2)
+    
+    return fig_main
+
+
+PRODUCT_COLORS = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEAA7']
+
+
+def _product_scatter(forecast_data, products):
+    """Trace class of a product chart: every line keeps up to MAX_DISPLAY_POINTS points"""
+    return _scatter_class(min(len(forecast_data), MAX_DISPLAY_POINTS) * len(products))
+
+
+def _product_color(position):
+    return PRODUCT_COLORS[position % len(PRODUCT_COLORS)]
+
+
+def _product_traces(forecast_data, products, scatter, positions):
+    """One downsampled line per product, colored by its position in the chart
+
+    Each line keeps its own points, so a trace does not depend on the other
+    products drawn with it.
+    """
+    dates = pd.to_datetime(forecast_data['full_date'])
+    values = forecast_data[products].to_numpy()
+    keep = lttb_indices(_days(dates), values, MAX_DISPLAY_POINTS) if len(dates) and products else None
+    marker_mode = 'lines+markers' if scatter is go.Scatter else 'lines'
+    return [
+        scatter(
+            x=dates.to_numpy()[keep[:, i]],
+            y=values[keep[:, i], i],
+            mode=marker_mode,
+            name=product,
+            line=dict(color=_product_color(position), width=2),
+            marker=dict(size=6)
+        )
+        for i, (product, position) in enumerate(zip(products, positions))
+    ]
+
+
+def create_product_forecast_chart(forecast_data, products_list, restaurant_color):
+    """Create product quantity forecast chart"""
+    products = [product for product in products_list if product in forecast_data.columns]
+    scatter = _product_scatter(forecast_data, products)
+    fig = go.Figure(_product_traces(forecast_data, products, scatter, range(len(products))))
+    
+    fig.update_layout(
+        title="Product Quantity Forecast",
+        xaxis_title="Date",
+        yaxis_title="Quantity",
+        height=400,
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+def update_product_forecast_chart(fig, forecast_data, products_list):
+    """Show ``products_list`` on a product chart of the same forecast, in place
+
+    Traces of products still shown are kept, the others dropped, and only
+    newly selected products are downsampled and added; colors follow the
+    new order. Returns None, leaving ``fig`` untouched, when the selection
+    crosses WEBGL_POINTS and every trace would change type.
+    """
+    products = [product for product in products_list if product in forecast_data.columns]
+    scatter = _product_scatter(forecast_data, products)
+    kept = {trace.name: trace for trace in fig.data if trace.name in products}
+    if not all(isinstance(trace, scatter) for trace in kept.values()):
+        return None
+    added = [product for product in products if product not in kept]
+    positions = {product: position for position, product in enumerate(products)}
+    fig.data = list(kept.values())
+    fig.add_traces(_product_traces(forecast_data, added, scatter, [positions[product] for product in added]))
+    by_name = {trace.name: trace for trace in fig.data}
+    fig.data = [by_name[product] for product in products]
+    for product, trace in kept.items():
+        color = _product_color(positions[product])
+        if trace.line.color != color:
+            trace.line.color = color
+    return fig
+
+
+def create_revenue_chart(forecast_data, restaurant_color):
+    """Create the overview revenue forecast chart"""
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=forecast_data['date'],
+        y=forecast_data['revenue'],
+        mode='lines+markers',
+        name='Revenue',
+        line=dict(color=restaurant_color, width=3),
+        marker=dict(color=restaurant_color, size=8)
+    ))
+    
+    fig.update_layout(
+        height=400,
+        xaxis_title="Date",
+        yaxis_title="Revenue (€)",
+        template="plotly_white",
+        hovermode='x unified'
+    )
+    
+    return fig
+
+
+def create_comparison_bar(comparison_df, metric):
+    """Create a bar chart of one metric per restaurant, in each restaurant's color"""
+    fig = go.Figure([
+        go.Bar(x=[name], y=[value], name=name, marker_color=color)
+        for name, value, color in zip(comparison_df['Restaurant'], comparison_df[metric], comparison_df['Color'])
+    ])
+    fig.update_layout(showlegend=False, height=350, xaxis_title='Restaurant', yaxis_title=metric)
+    return fig
+
+
+def create_backtest_horizon_chart(by_horizon, restaurant_color):
+    """WAPE by days ahead for the revenue and customers backtests"""
+    colors = {'revenue': restaurant_color, 'customers': '#1f77b4'}
+    fig = go.Figure([
+        go.Scatter(
+            x=frame['horizon'],
+            y=frame['wape'],
+            mode='lines+markers',
+            name=series,
+            line=dict(color=colors.get(series))
+        )
+        for series, frame in by_horizon.groupby('series', sort=False)
+    ])
+    fig.update_layout(
+        height=350,
+        xaxis_title='Days ahead',
+        yaxis_title='WAPE (%)',
+        template="plotly_white",
+        hovermode='x unified'
+    )
+    return fig
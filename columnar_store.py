@@ -0,0 +1,419 @@
+"""Memory-mapped columnar store of daily history, one directory per site.
+
+Each site's days are kept as one ``.npy`` file per column (dates as
+``datetime64[D]``, metrics and product quantities in their own dtypes) next
+to a small ``meta.json`` with the column names and the number of stored
+rows. Columns are opened with ``np.load(mmap_mode='r')`` and frames are
+built on the mapped arrays without copying, so a query touches only the
+pages of the rows and columns it reads and sessions share them through the
+OS page cache instead of each holding a copy.
+
+Files are allocated with spare rows. Appending days to a site writes into
+that tail and then rewrites ``meta.json`` (via a temp file) with the new row
+count, so readers never see a partial append; frames built before the append
+keep their own length. A file that runs out of room is copied once into one
+with twice the capacity.
+
+Uploads are stored under their content hash and such a store never changes:
+a delta upload copies the base files into a new directory, appends there and
+publishes it under the combined hash, so the base upload is still found when
+it is uploaded again and two sessions appending different days to the same
+base cannot write into each other's files.
+
+Convert existing files once with::
+
+    python columnar_store.py sales_2024.csv --site maslow
+    python columnar_store.py pos_export.csv
+
+Uploaded-format files (one row per day) are stored as they are; line-item
+exports (one row per dish sold) are aggregated to days and split by their
+restaurant column. A site is stored only with the columns the forecast
+needs, so line items must carry customers (covers) or a ticket id: dish
+sales alone, like ``cleaned_sales_data_maslow.xlsx``, are rejected.
+
+Plain NumPy/pandas, no Streamlit imports.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import REQUIRED_COLUMNS
+from ingestion import CACHE_DIR, DailyAggregator, is_transaction_frame, optimize_frame, parse_upload
+
+STORE_DIR = CACHE_DIR / 'columnar'
+
+# Rows allocated past the stored days, so a year of daily appends never reallocates
+SPARE_ROWS = 366
+SITE_COLUMNS = ('restaurant', 'site', 'store')
+
+_META = 'meta.json'
+_DATES = 'date.npy'
+
+
+def _column_file(position):
+    return f'c{position:04d}.npy'
+
+
+def _day_array(dates):
+    return np.asarray(pd.to_datetime(dates).to_numpy(), dtype='datetime64[D]')
+
+
+def _allocate(path, dtype, capacity, values):
+    array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(capacity,))
+    array[:len(values)] = values
+    array.flush()
+
+
+class ColumnarStore:
+    """Per-site daily columns in memory-mapped ``.npy`` files under ``root``"""
+
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        # path -> ((inode, size), mapped array); a replaced file has a new inode
+        self._maps = {}
+
+    @property
+    def sites(self):
+        if not self.root.exists():
+            return []
+        return sorted(
+            unquote(path.parent.name) for path in self.root.glob(f'*/{_META}')
+            if not path.parent.name.endswith(('.tmp', '.old'))
+        )
+
+    def __contains__(self, site):
+        return (self._site_dir(site) / _META).exists()
+
+    def _site_dir(self, site):
+        return self.root / quote(str(site), safe='')
+
+    def _meta(self, site):
+        return self._meta_at(self._site_dir(site))
+
+    def _meta_at(self, site_dir):
+        with open(site_dir / _META) as meta_file:
+            return json.load(meta_file)
+
+    def _save_meta(self, site_dir, meta):
+        tmp_path = site_dir / (_META + '.tmp')
+        with open(tmp_path, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp_path, site_dir / _META)
+
+    def _open(self, path):
+        """Read-only mapping of a column file, reopened only when the file was replaced
+
+        Appends within a file's capacity write through the same mapping, so
+        a cached array sees them.
+        """
+        stat = os.stat(path)
+        identity = (stat.st_ino, stat.st_size)
+        cached = self._maps.get(path)
+        if cached is None or cached[0] != identity:
+            cached = self._maps[path] = (identity, np.load(path, mmap_mode='r'))
+        return cached[1]
+
+    def rows(self, site):
+        return self._meta(site)['rows']
+
+    def columns(self, site):
+        return list(self._meta(site)['columns'])
+
+    def write(self, site, history, replace=True):
+        """Store a site's daily history (date and numeric columns)
+
+        Text columns are left out. The files are written to a new directory
+        that then takes the old one's place; without ``replace`` a store
+        already there (written meanwhile by another session) is kept.
+        """
+        history = history.sort_values('date', kind='stable')
+        dates = _day_array(history['date'])
+        if len(dates) > 1 and (np.diff(dates) == np.timedelta64(0, 'D')).any():
+            raise ValueError(f"Duplicate dates for site {site!r}")
+        columns = [
+            col for col in history.columns
+            if col != 'date' and pd.api.types.is_numeric_dtype(history[col])
+        ]
+        capacity = len(dates) + SPARE_ROWS
+
+        site_dir = self._site_dir(site)
+        tmp_dir = self._tmp_dir(site_dir)
+        _allocate(tmp_dir / _DATES, dates.dtype, capacity, dates)
+        for position, col in enumerate(columns):
+            values = history[col].to_numpy()
+            _allocate(tmp_dir / _column_file(position), values.dtype, capacity, values)
+        self._save_meta(tmp_dir, {
+            'site': str(site), 'rows': len(dates), 'capacity': capacity, 'columns': [str(col) for col in columns]
+        })
+        self._publish(tmp_dir, site_dir, replace)
+
+    def _tmp_dir(self, site_dir):
+        # One per writer, so sessions storing the same key at once do not share files
+        self.root.mkdir(parents=True, exist_ok=True)
+        return Path(tempfile.mkdtemp(dir=self.root, prefix=site_dir.name + '.', suffix='.tmp'))
+
+    def _publish(self, tmp_dir, site_dir, replace=False):
+        """Move a finished ``tmp_dir`` into place; without ``replace`` an existing store wins"""
+        if site_dir.exists():
+            if not replace:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return
+            # Readers holding the old files keep them until they let go
+            old_dir = Path(tempfile.mkdtemp(dir=self.root, prefix=site_dir.name + '.', suffix='.old'))
+            os.rename(site_dir, old_dir / 'site')
+            shutil.rmtree(old_dir, ignore_errors=True)
+        try:
+            os.rename(tmp_dir, site_dir)
+        except OSError:
+            # Another writer published the same key first
+            if not site_dir.exists():
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def append(self, site, frame):
+        """Add days after the site's last stored day, with the same columns
+
+        For stores named by site; content-keyed stores are extended into a
+        new key with ``extend`` instead.
+        """
+        self._append_at(self._site_dir(site), frame)
+
+    def extend(self, site, new_site, frame):
+        """Store ``site``'s days followed by ``frame``'s as ``new_site``, leaving ``site`` as it is
+
+        The files are copied to a new directory, the days are appended there
+        and the directory is then published as ``new_site``. Stores are keyed
+        by content, so an existing ``new_site`` already holds these days and
+        is kept.
+        """
+        target = self._site_dir(new_site)
+        if new_site in self:
+            return
+        tmp_dir = self._tmp_dir(target)
+        try:
+            for path in self._site_dir(site).iterdir():
+                if path.suffix in ('.npy', '.json'):
+                    shutil.copyfile(path, tmp_dir / path.name)
+            meta = self._meta_at(tmp_dir)
+            meta['site'] = str(new_site)
+            self._save_meta(tmp_dir, meta)
+            self._append_at(tmp_dir, frame)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._publish(tmp_dir, target)
+
+    def _append_at(self, site_dir, frame):
+        meta = self._meta_at(site_dir)
+        columns = meta['columns']
+        missing = [col for col in columns if col not in frame.columns]
+        if missing:
+            raise ValueError(f"Appended days are missing columns {missing}")
+        dates = _day_array(frame['date'])
+        if len(dates) == 0:
+            return
+        if (np.diff(dates) <= np.timedelta64(0, 'D')).any():
+            raise ValueError("Appended dates must be increasing")
+        rows = meta['rows']
+        if rows:
+            last_day = np.load(site_dir / _DATES, mmap_mode='r')[rows - 1]
+            if dates[0] <= last_day:
+                raise ValueError(f"Appended days must follow {last_day}, the last stored day of {meta['site']!r}")
+
+        end = rows + len(dates)
+        if end > meta['capacity']:
+            meta['capacity'] = max(end, 2 * meta['capacity'])
+        for name, values in [(_DATES, dates)] + [
+            (_column_file(position), frame[col].to_numpy()) for position, col in enumerate(columns)
+        ]:
+            self._append_file(site_dir / name, rows, meta['capacity'], values)
+        meta['rows'] = end
+        self._save_meta(site_dir, meta)
+
+    def _append_file(self, path, rows, capacity, values):
+        stored = np.load(path, mmap_mode='r')
+        dtype = np.result_type(stored.dtype, values.dtype)
+        if len(stored) >= capacity and dtype == stored.dtype:
+            del stored
+            array = np.load(path, mmap_mode='r+')
+            array[rows:rows + len(values)] = values
+            array.flush()
+            return
+        # Out of room, or the new values need a wider dtype: copy into a new file
+        tmp_path = path.with_name(path.name + '.tmp')
+        array = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(capacity,))
+        array[:rows] = stored[:rows]
+        array[rows:rows + len(values)] = values
+        array.flush()
+        del array, stored
+        os.replace(tmp_path, path)
+
+    def dates(self, site):
+        """Stored days of ``site`` as a mapped ``datetime64[D]`` array"""
+        return self._open(self._site_dir(site) / _DATES)[:self.rows(site)]
+
+    def column(self, site, name):
+        """One stored column of ``site`` as a mapped array"""
+        meta = self._meta(site)
+        position = meta['columns'].index(name)
+        return self._open(self._site_dir(site) / _column_file(position))[:meta['rows']]
+
+    def history(self, site, start=None, end=None, columns=None):
+        """Frame of ``site``'s days from ``start`` through ``end`` (inclusive), in the upload layout
+
+        Every column except the date is a view of its mapped file, so the
+        frame is read-only and costs no memory until its pages are read.
+        """
+        meta = self._meta(site)
+        site_dir = self._site_dir(site)
+        rows = meta['rows']
+        dates = self._open(site_dir / _DATES)[:rows]
+        first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, 'D'), side='left'))
+        last = rows if end is None else int(np.searchsorted(dates, np.datetime64(end, 'D'), side='right'))
+        last = max(first, last)
+
+        positions = {col: position for position, col in enumerate(meta['columns'])}
+        data = {'date': dates[first:last].astype('datetime64[ns]')}
+        for col in meta['columns'] if columns is None else columns:
+            data[col] = self._open(site_dir / _column_file(positions[col]))[first:last]
+        return pd.DataFrame(data, copy=False)
+
+
+_stores = {}
+
+
+def open_store(root=STORE_DIR):
+    """The ColumnarStore of ``root``, shared by every caller so its mapped files are reused"""
+    root = Path(root).resolve()
+    store = _stores.get(root)
+    if store is None:
+        store = _stores.setdefault(root, ColumnarStore(root))
+    return store
+
+
+def _storable(frame):
+    """Whether the frame has a date and every other column survives the store (it keeps numeric columns only)"""
+    return 'date' in frame.columns and all(
+        col == 'date' or pd.api.types.is_numeric_dtype(frame[col]) for col in frame.columns
+    )
+
+
+def mapped_history(key, load, root=STORE_DIR):
+    """Memory-mapped history stored under ``key``, calling ``load()`` only when it is not stored yet
+
+    Keys are content hashes, so a stored site is never stale. Frames with
+    text columns, or a store that cannot be written, fall back to the
+    loaded frame itself.
+    """
+    store = open_store(root)
+    try:
+        if key in store:
+            return store.history(key)
+    except (OSError, ValueError):
+        pass
+    frame = load()
+    if not _storable(frame):
+        return frame
+    try:
+        store.write(key, frame, replace=False)
+        return store.history(key)
+    except (OSError, ValueError):
+        return frame
+
+
+def append_mapped(previous_key, key, history, delta, root=STORE_DIR):
+    """``history`` (stored as ``previous_key``) followed by ``delta``, stored and mapped as ``key``
+
+    The stored files are extended with the new days; ``history`` is only
+    copied, by concatenating it with ``delta`` in memory, when it was not
+    stored. The concatenation itself is returned when nothing can be stored.
+    """
+    store = open_store(root)
+    if _storable(history):
+        try:
+            if key in store:
+                return store.history(key)
+            if previous_key in store and store.rows(previous_key) == len(history):
+                store.extend(previous_key, key, delta)
+                return store.history(key)
+        except (OSError, ValueError):
+            pass
+    frame = pd.concat([history, delta], ignore_index=True)
+    if not _storable(frame):
+        return frame
+    try:
+        store.write(key, frame, replace=False)
+        return store.history(key)
+    except (OSError, ValueError):
+        return frame
+
+
+def load_sites(file_name, data, site=None):
+    """{site: daily history} of an uploaded-format or line-item CSV/Excel file
+
+    Rows are split by a restaurant/site/store column when there is one;
+    otherwise the file is one site, named ``site`` or after the file.
+    """
+    frame = parse_upload(file_name, data)
+    site_column = next((col for col in frame.columns if str(col).strip().lower() in SITE_COLUMNS), None)
+    if site_column is None:
+        groups = [(site or Path(file_name).stem, frame)]
+    else:
+        groups = frame.groupby(site_column, sort=False)
+
+    histories = {}
+    for name, rows in groups:
+        if site_column is not None:
+            rows = rows.drop(columns=site_column)
+        if is_transaction_frame(rows):
+            aggregator = DailyAggregator()
+            aggregator.add(rows)
+            histories[str(name)] = aggregator.result()
+        else:
+            histories[str(name)] = optimize_frame(rows)
+    return histories
+
+
+def convert_file(path, root=STORE_DIR, site=None):
+    """Write every site of a CSV/Excel file to the store; returns {site: stored days}"""
+    path = Path(path)
+    store = open_store(root)
+    histories = load_sites(path.name, path.read_bytes(), site)
+    for name, history in histories.items():
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in history.columns]
+        if missing_columns:
+            # Line items only count customers from a customers (covers) or ticket column
+            raise ValueError(f"{path.name}: site {name!r} is missing required columns {missing_columns}")
+    for name, history in histories.items():
+        store.write(name, history)
+    return {name: store.rows(name) for name in histories}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSV/Excel sales files into the columnar history store")
+    parser.add_argument('files', nargs='+', type=Path)
+    parser.add_argument('--site', default=None, help="site name for files without a restaurant column")
+    parser.add_argument('--root', type=Path, default=STORE_DIR)
+    args = parser.parse_args(argv)
+
+    for path in args.files:
+        try:
+            converted = convert_file(path, args.root, args.site)
+        except ValueError as error:
+            print(error, file=sys.stderr)
+            return 1
+        for name, rows in converted.items():
+            print(f"{path} -> {args.root / quote(name, safe='')} ({rows} days)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+"""Paginated view of a forecast frame for the Detailed Data tab.
+
+Sorting and filtering work on row positions (a boolean mask and an argsort
+over the column arrays), so the cached forecast frame is never copied. Only
+the rows of the visible page are taken out of it and formatted for display.
+"""
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [25, 50, 100]
+
+# Display name -> forecast column of the columns every table shows
+DISPLAY_COLUMNS = {
+    'date': 'date',
+    'Revenue': 'revenue',
+    'Customers': 'customers',
+    'Staff Needed': 'staff_needed',
+}
+
+
+
+def format_thousands(values, prefix=''):
+    """Whole numbers as ``prefix`` + ``'{:,}'`` strings, built as one array of character codes
+
+    Digits come from integer division by powers of ten and are laid out
+    right-aligned with a comma before every group of three; each row is then
+    shifted left past its padding and the codes are read as strings, so no
+    Python code runs per value.
+    """
+    values = np.rint(np.asarray(values, dtype=np.float64)).astype(np.int64)
+    rows = np.arange(len(values))
+    magnitude = np.abs(values).astype(np.uint64)
+    places = np.arange(len(str(int(magnitude.max(initial=0)))))  # 0: units
+    powers = np.uint64(10) ** places.astype(np.uint64)
+    digits = (magnitude[:, None] // powers) % np.uint64(10)
+    n_digits = np.maximum(1, (magnitude[:, None] >= powers).sum(axis=1))
+    commas = np.arange(1, (len(places) - 1) // 3 + 1)
+
+    width = len(prefix) + 1 + len(places) + len(commas)
+    codes = np.zeros((len(values), width), dtype=np.uint32)
+    codes[:, width - 1 - places - places // 3] = np.where(places < n_digits[:, None], digits + ord('0'), 0)
+    codes[:, width - 4 * commas] = np.where(n_digits[:, None] > 3 * commas, ord(','), 0)
+    number_start = width - n_digits - (n_digits - 1) // 3
+    negative = values < 0
+    codes[rows[negative], number_start[negative] - 1] = ord('-')
+    start = number_start - negative - len(prefix)
+    for i, char in enumerate(prefix):
+        codes[rows, start + i] = ord(char)
+
+    # Trailing zero codes end a string, so left-aligned rows read back at their own length
+    shifted = start[:, None] + np.arange(width)
+    codes = np.where(shifted < width, np.take_along_axis(codes, np.minimum(shifted, width - 1), axis=1), 0)
+    return np.ascontiguousarray(codes, dtype=np.uint32).view(f'U{width}').ravel()
+
+
+def format_euros(values):
+    return format_thousands(values, prefix='€')
+
+
+# Display formats, applied to the visible page only: each takes a column's values and returns their strings
+FORMATS = {
+    'Revenue': format_euros,
+}
+
+
+def table_columns(forecast_data, products_list):
+    """Display name -> forecast column, product columns included"""
+    columns = dict(DISPLAY_COLUMNS)
+    columns.update({product: product for product in products_list if product in forecast_data.columns})
+    return columns
+
+
+def row_positions(forecast_data, sort_column=None, descending=False, days_of_week=None):
+    """Positions of the rows to show, filtered to ``days_of_week`` and sorted by ``sort_column``
+
+    Ties keep forecast order in both directions.
+    """
+    positions = np.arange(len(forecast_data))
+    if days_of_week:
+        positions = positions[forecast_data['day_of_week'].isin(days_of_week).to_numpy()]
+    if sort_column is not None:
+        # 'date' holds 'Mon DD' labels; sort by the ISO date instead
+        values = forecast_data['full_date' if sort_column == 'date' else sort_column].to_numpy()[positions]
+        if descending:
+            order = len(values) - 1 - np.argsort(values[::-1], kind='stable')[::-1]
+        else:
+            order = np.argsort(values, kind='stable')
+        positions = positions[order]
+    return positions
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+
+def format_page(forecast_data, positions, columns, page, page_size):
+    """Display frame of one page (1-based) of ``positions``"""
+    rows = positions[(page - 1) * page_size:page * page_size]
+    # Rows are taken from the shown columns' arrays, never from the whole frame
+    page_frame = pd.DataFrame(
+        {name: forecast_data[column].to_numpy()[rows] for name, column in columns.items()},
+        index=forecast_data.index[rows],
+    )
+    for name, formatter in FORMATS.items():
+        page_frame[name] = formatter(page_frame[name].to_numpy())
+    return page_frame
@@ -0,0 +1,57 @@
+"""Largest-triangle-three-buckets (LTTB) downsampling for chart display.
+
+LTTB keeps the first and last points and, from each bucket in between, the
+point forming the largest triangle with the previously kept point and the
+average of the next bucket. Peaks and dips survive, unlike with striding or
+bucket means. Several series sharing one x axis (a frame of product columns)
+are downsampled together, each keeping its own points.
+
+Plain NumPy, no plotly or Streamlit imports.
+"""
+import numpy as np
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points LTTB keeps out of ``len(x)``
+
+    ``y`` is (n,) or (n, series); the result is (threshold,) or
+    (threshold, series) and increasing down each column. Series that already
+    have ``threshold`` points or fewer are returned whole.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    single = y.ndim == 1
+    if single:
+        y = y[:, None]
+    n, n_series = y.shape
+    if threshold >= n or threshold < 3:
+        indices = np.repeat(np.arange(n)[:, None], n_series, axis=1)
+        return indices[:, 0] if single else indices
+
+    columns = np.arange(n_series)
+    every = (n - 2) / (threshold - 2)
+    indices = np.empty((threshold, n_series), dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    selected = np.zeros(n_series, dtype=np.int64)
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * every) + 1
+        end = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, n)
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean(axis=0) if next_end > end else y[-1]
+
+        # Twice the triangle area for every candidate of every series at once
+        selected_x = x[selected]
+        selected_y = y[selected, columns]
+        area = np.abs(
+            (selected_x - next_x) * (y[start:end] - selected_y)
+            - (selected_x[None, :] - x[start:end, None]) * (next_y - selected_y)
+        )
+        selected = start + area.argmax(axis=0)
+        indices[bucket + 1] = selected
+
+    return indices[:, 0] if single else indices
@@ -0,0 +1,35 @@
+"""Serialization of forecast frames for the download buttons."""
+import io
+
+# Long horizons are written in xlsxwriter's constant-memory mode (row by row,
+# flushed to a temp file) instead of holding every cell in memory
+CONSTANT_MEMORY_ROWS = 60
+
+
+def forecast_to_csv(forecast_data):
+    """CSV bytes of a forecast frame"""
+    return forecast_data.to_csv(index=False).encode('utf-8')
+
+
+def forecast_to_excel(forecast_data, sheet_name='Forecast'):
+    """Excel workbook bytes of a forecast frame
+
+    Rows are written in order with xlsxwriter directly: pandas' ExcelWriter
+    emits cells column by column, which constant-memory mode cannot store.
+    """
+    import xlsxwriter  # only loaded once an Excel export is requested
+
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': len(forecast_data) >= CONSTANT_MEMORY_ROWS,
+        'nan_inf_to_errors': True,
+    })
+    worksheet = workbook.add_worksheet(sheet_name)
+    header_format = workbook.add_format({'bold': True, 'border': 1})
+
+    worksheet.write_row(0, 0, [str(col) for col in forecast_data.columns], header_format)
+    for row, values in enumerate(forecast_data.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row, 0, values)
+
+    workbook.close()
+    return output.getvalue()
@@ -0,0 +1,76 @@
+"""Memoized plotly figures keyed on the data they plot.
+
+Streamlit reruns the whole script on every widget interaction. A chart whose
+inputs did not change is served from here instead of being rebuilt. Keys
+hold everything a figure is drawn from (the forecast key, which also fixes
+the restaurant color, the window), so a figure cached with ``get_or_build``
+is never changed after it is built.
+
+A figure cached with ``get_or_patch`` also has a variant, such as the
+products shown. Asking for the same key with another variant patches the
+cached figure's traces in place instead of rebuilding it; one figure is
+kept per key, whatever variant it shows.
+"""
+from collections import OrderedDict
+
+DEFAULT_MAX_FIGURES = 16
+
+
+class FigureCache:
+    """LRU cache of figures keyed on (forecast id, chart, ...) tuples"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_FIGURES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.builds = 0
+        self.patches = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_build(self, key, build):
+        """Figure for ``key``, calling ``build()`` on a miss"""
+        return self.get_or_patch(key, None, build, None)
+
+    def get_or_patch(self, key, variant, build, patch):
+        """Figure for ``key`` showing ``variant``
+
+        A figure cached for another variant is updated by ``patch(figure)``,
+        which changes it in place and returns it, or returns None when it
+        cannot and ``build()`` is called instead.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry['variant'] != variant:
+            if patch(entry['figure']) is None:
+                entry = None
+            else:
+                self.patches += 1
+                entry['variant'] = variant
+                entry['payload'] = None
+        elif entry is not None:
+            self.hits += 1
+        if entry is None:
+            self.builds += 1
+            entry = {'figure': build(), 'variant': variant, 'payload': None}
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        return entry['figure']
+
+    def payload(self, key):
+        """(JSON bytes, points) of the cached figure for ``key``, measured once per variant"""
+        entry = self._entries[key]
+        if entry['payload'] is None:
+            from charts import figure_payload
+            entry['payload'] = figure_payload(entry['figure'])
+        return entry['payload']
+
+    def discard_source(self, source):
+        """Drop every figure of a forecast of ``source`` (keys start with its forecast key)"""
+        for key in [key for key in self._entries if key[0][0] == source]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
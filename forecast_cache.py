@@ -0,0 +1,30 @@
+"""Forecast cache keys: data fingerprint, horizon, model parameters and seed.
+
+Streamlit reruns the whole script on every widget interaction; forecasts are
+kept in the shared cache (``shared_cache.py``) under these keys, so switching
+views or tabs never recomputes a forecast.
+"""
+import hashlib
+
+import pandas as pd
+
+# Forecasts a session holds in the shared cache
+DEFAULT_MAX_ENTRIES = 32
+
+
+def frame_fingerprint(frame):
+    """Content hash of a DataFrame: column names, dtypes, index and values"""
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in frame.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def forecast_key(source, forecast_days, model_params=None, seed=None):
+    """Cache key for one forecast
+
+    ``source`` is a data fingerprint for uploaded data or a restaurant key for
+    the default restaurants.
+    """
+    params = tuple(sorted((model_params or {}).items()))
+    return (source, forecast_days, params, seed)
@@ -0,0 +1,141 @@
+"""Headless batch forecasts for cron jobs, without Streamlit or plotly.
+
+Examples:
+    python forecast_cli.py --days 7 30 90 --out-dir forecasts
+    python forecast_cli.py --restaurants maslow temple --days 30 --format parquet
+    python forecast_cli.py --history sales_2024.csv --days 14
+    python forecast_cli.py --history pos_export.csv --transactions --days 14
+    python forecast_cli.py --stored maslow --days 30 90
+    python forecast_cli.py --days 30 --reconciliation none
+
+Product forecasts are reconciled like the dashboard's (MinT by default), so
+files written for an upload match what the dashboard shows for it.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+import pandas as pd
+
+from columnar_store import STORE_DIR, open_store
+from forecast_engine import (
+    DEFAULT_MODEL,
+    DEFAULT_SEED,
+    FORECAST_MODELS,
+    REQUIRED_COLUMNS,
+    forecast_from_history,
+    restaurants,
+)
+from forecast_executor import DEFAULT_WORKERS, run_restaurant_forecasts
+from ingestion import optimize_frame, parse_upload, stream_daily_totals
+from reconciliation import DEFAULT_RECONCILIATION, RECONCILIATION_METHODS, reconcile_history_forecast
+
+FORMATS = ('csv', 'parquet')
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate restaurant forecasts in batch and write them to CSV/Parquet"
+    )
+    parser.add_argument(
+        '--restaurants', nargs='*', choices=list(restaurants), default=None,
+        help="default restaurants to forecast (all of them unless --history or --stored is given)"
+    )
+    parser.add_argument(
+        '--history', nargs='*', default=[], type=Path,
+        help="uploaded-format CSV/Excel history files to forecast from"
+    )
+    parser.add_argument(
+        '--transactions', action='store_true',
+        help="treat --history CSV files as ticket-level exports and aggregate them to days"
+    )
+    parser.add_argument(
+        '--stored', nargs='*', default=[],
+        help="sites of the columnar history store to forecast from (see columnar_store.py)"
+    )
+    parser.add_argument('--store-dir', type=Path, default=STORE_DIR)
+    parser.add_argument('--days', nargs='+', type=int, default=[7], help="forecast horizons in days")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--model', choices=FORECAST_MODELS, default=DEFAULT_MODEL,
+                        help="model for --history files")
+    parser.add_argument('--reconciliation', choices=RECONCILIATION_METHODS + ('none',),
+                        default=DEFAULT_RECONCILIATION,
+                        help="how product forecasts are reconciled with customer volume, as in the dashboard")
+    parser.add_argument('--start', type=pd.Timestamp, default=None,
+                        help="first forecast day for default restaurants (default: tomorrow)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--processes', action='store_true', help="use a process pool instead of threads")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--out-dir', type=Path, default=Path('forecasts'))
+    return parser
+
+
+def write_forecast(forecast, path, file_format):
+    if file_format == 'parquet':
+        forecast.to_parquet(path, index=False)
+    else:
+        forecast.to_csv(path, index=False)
+
+
+def load_history(path, transactions):
+    """Daily history frame from an uploaded-format or ticket-level file"""
+    if transactions:
+        with open(path, 'rb') as history_file:
+            return stream_daily_totals(history_file)
+    return optimize_frame(parse_upload(path.name, path.read_bytes()))
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    reconciliation = None if args.reconciliation == 'none' else args.reconciliation
+    restaurant_keys = args.restaurants
+    if restaurant_keys is None:
+        restaurant_keys = [] if args.history or args.stored else list(restaurants)
+
+    # Stored sites are read from memory-mapped columns, never parsed
+    store = open_store(args.store_dir)
+    unknown_sites = [site for site in args.stored if site not in store]
+    if unknown_sites:
+        print(f"{args.store_dir}: no stored sites {unknown_sites} (stored: {store.sites})", file=sys.stderr)
+        return 1
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    written = 0
+
+    for days in args.days:
+        frames, timings = run_restaurant_forecasts(
+            restaurant_keys, days, workers=args.workers, use_processes=args.processes,
+            start=args.start, seed=args.seed, reconciliation=reconciliation
+        )
+        for rest_key, forecast in frames.items():
+            path = args.out_dir / f"forecast_{rest_key}_{days}days.{args.format}"
+            write_forecast(forecast, path, args.format)
+            written += 1
+            print(f"{path} ({timings[rest_key] * 1000:.1f} ms)")
+
+    histories = [(path, path.stem, lambda path=path: load_history(path, args.transactions)) for path in args.history]
+    histories += [(site, quote(site, safe=''), lambda site=site: store.history(site)) for site in args.stored]
+    for source, name, load in histories:
+        history = load()
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in history.columns]
+        if missing_columns:
+            print(f"{source}: missing required columns {missing_columns}", file=sys.stderr)
+            return 1
+        for days in args.days:
+            forecast = forecast_from_history(history, days, seed=args.seed, model=args.model)
+            if reconciliation is not None:
+                forecast = reconcile_history_forecast(forecast, history, reconciliation)
+            path = args.out_dir / f"forecast_{name}_{days}days.{args.format}"
+            write_forecast(forecast, path, args.format)
+            written += 1
+            print(path)
+
+    print(f"Wrote {written} forecasts in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
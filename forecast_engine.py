@@ -0,0 +1,392 @@
+"""Vectorized forecast engine for the restaurant dashboard.
+
+Everything here is plain NumPy/pandas so it can be imported without Streamlit
+(benchmarks, batch jobs). app.py wraps these functions with its UI messages.
+"""
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from seasonal_model import DEFAULT_INTERVAL_LEVEL, MIN_HISTORY_DAYS, SeasonalModel, fourier_order_for_span
+
+# Restaurant configurations with enhanced data
+restaurants = {
+    'maslow': {
+        'name': 'Maslow Mégisserie',
+        'concept': 'Artisanal Vegetarian • Shared Plates',
+        'color': '#FF8C00',
+        'light_color': '#FFE4B5',
+        'base_metrics': {
+            'revenue': 1200,
+            'customers': 72,
+            'staff_needed': 8,
+            'products': {
+                'Vegetarian Bowl': 25,
+                'Shared Tapas': 30,
+                'Artisan Salads': 15,
+                'Fresh Juices': 20,
+                'Dessert Plates': 12
+            }
+        }
+    },
+    'fellows': {
+        'name': 'Fellows Restaurant',
+        'concept': 'Artisanal Pasta • 100% Maison',
+        'color': '#2F2F2F',
+        'light_color': '#E8E8E8',
+        'base_metrics': {
+            'revenue': 950,
+            'customers': 108,
+            'staff_needed': 6,
+            'products': {
+                'Fresh Pasta': 40,
+                'Risotto': 20,
+                'Wine Selection': 35,
+                'Antipasti': 18,
+                'Tiramisu': 15
+            }
+        }
+    },
+    'temple': {
+        'name': 'Maslow Temple',
+        'concept': 'Premium Experience • Temple',
+        'color': '#8B0000',
+        'light_color': '#FFB6C1',
+        'base_metrics': {
+            'revenue': 1800,
+            'customers': 30,
+            'staff_needed': 12,
+            'products': {
+                'Tasting Menu': 15,
+                'Premium Wine': 25,
+                'Appetizer Course': 30,
+                'Main Course': 30,
+                'Dessert Course': 30
+            }
+        }
+    }
+}
+
+# Staff added per extra customer above the base volume
+STAFF_RATIOS = {
+    'temple': 0.4,  # Premium service needs more staff per customer
+    'maslow': 0.11,  # Shared plates need moderate staffing
+}
+DEFAULT_STAFF_RATIO = 0.06  # Fellows - efficient pasta service
+
+# Seed used until the user picks another one in the sidebar
+DEFAULT_SEED = 42
+
+# RNG stream name for forecasts of uploaded history
+UPLOADED_STREAM = 'uploaded'
+
+# Columns every uploaded history must provide
+REQUIRED_COLUMNS = ['date', 'revenue', 'customers']
+
+# Non-product columns of an uploaded history
+BASE_COLUMNS = ['date', 'revenue', 'customers', 'staff']
+
+# Non-product columns a forecast frame adds
+FORECAST_COLUMNS = ['full_date', 'day_of_week', 'staff_needed', 'restaurant',
+                    'revenue_lower', 'revenue_upper', 'customers_lower', 'customers_upper']
+
+# Models for uploaded history: seasonal least squares, or the history mean
+# with a sine trend and random variation
+FORECAST_MODELS = ('seasonal', 'baseline')
+DEFAULT_MODEL = 'seasonal'
+
+# Fewest staff scheduled on any day
+MIN_STAFF = 3
+
+
+def forecast_rng(stream, horizon, seed=DEFAULT_SEED):
+    """Independent, reproducible random stream for one (restaurant, horizon, seed)
+
+    crc32 keeps the stream id stable across processes, unlike hash().
+    """
+    stream_id = zlib.crc32(str(stream).encode('utf-8'))
+    return np.random.default_rng([seed, stream_id, horizon])
+
+
+def get_product_columns(history):
+    """Numeric product columns of an uploaded history frame"""
+    return [
+        col for col in history.columns
+        if col not in BASE_COLUMNS
+        and pd.api.types.is_numeric_dtype(history[col])
+        and not pd.api.types.is_bool_dtype(history[col])
+    ]
+
+
+def forecast_product_columns(frame):
+    """Product columns of a history or forecast frame"""
+    return [col for col in get_product_columns(frame) if col not in FORECAST_COLUMNS]
+
+
+def _column_means(history, columns):
+    """Means in float64, whatever narrower dtype the columns were stored as"""
+    return history[columns].astype(np.float64).mean().to_numpy()
+
+
+def _truncate(values):
+    """Truncate towards zero like int(), refusing NaN/inf like int() does"""
+    if not np.all(np.isfinite(values)):
+        raise ValueError("cannot convert float NaN to integer")
+    return np.trunc(values).astype(np.int64)
+
+
+def _date_columns(dates):
+    """Display columns shared by every forecast frame"""
+    return {
+        'date': dates.strftime('%b %d'),
+        'full_date': dates.strftime('%Y-%m-%d'),
+    }
+
+
+def _non_negative_counts(values):
+    """Round model output to whole, non-negative counts"""
+    return _truncate(np.rint(np.maximum(values, 0)))
+
+
+def forecast_from_history(history, days_ahead, seed=DEFAULT_SEED, model=DEFAULT_MODEL,
+                          level=DEFAULT_INTERVAL_LEVEL, fit=None):
+    """Forecast every horizon day and product column of an uploaded history
+
+    The seasonal model adds ``revenue_lower``/``revenue_upper`` and
+    ``customers_lower``/``customers_upper`` columns for a central interval of
+    ``level``. Histories shorter than MIN_HISTORY_DAYS use the baseline model.
+    ``fit`` is a HistoryFit of ``history`` to forecast from instead of
+    refitting it.
+    """
+    if model not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model {model!r}, expected one of {FORECAST_MODELS}")
+    history_days = fit.n_days if fit is not None else history['date'].nunique()
+    if model == 'seasonal' and history_days >= MIN_HISTORY_DAYS:
+        return seasonal_forecast_from_history(history, days_ahead, level, fit)
+    return baseline_forecast_from_history(history, days_ahead, seed)
+
+
+def seasonal_columns(history):
+    """Metric and product columns the seasonal model fits, metrics first"""
+    metric_columns = ['revenue', 'customers'] + (['staff'] if 'staff' in history.columns else [])
+    return metric_columns + get_product_columns(history)
+
+
+class HistoryFit:
+    """Seasonal models of a history's columns, kept up to date as days are appended
+
+    Columns without gaps share one design matrix and are fit together in a
+    single solve; columns with missing days are fit one at a time so a gap in
+    one product does not drop that day for the others.
+    """
+
+    def __init__(self, history, columns):
+        dates = pd.DatetimeIndex(pd.to_datetime(history['date'])).normalize()
+        values = history[columns].to_numpy(dtype=np.float64)
+        self.columns = list(columns)
+        self.complete = np.isfinite(values).all(axis=0)
+        self.first_date = dates.min()
+        self.last_date = dates.max()
+        self.n_days = dates.nunique()
+        self.batch = SeasonalModel.fit(dates, values[:, self.complete]) if self.complete.any() else None
+        self.singles = {i: SeasonalModel.fit(dates, values[:, i]) for i in np.flatnonzero(~self.complete)}
+
+    @classmethod
+    def fit(cls, history):
+        return cls(history, seasonal_columns(history))
+
+    def update(self, delta):
+        """Add days after ``last_date``; False when they need a refit instead
+
+        A refit is needed when the appended days would change how the
+        history is modelled: the span reaching a year switches on the yearly
+        terms, and a gap in a complete column moves it out of the batch.
+        """
+        dates = pd.DatetimeIndex(pd.to_datetime(delta['date'])).normalize()
+        values = delta[self.columns].to_numpy(dtype=np.float64)
+        if len(dates) == 0:
+            return True
+        if dates.min() <= self.last_date:
+            return False
+        span_days = (dates.max() - self.first_date).days + 1
+        fourier_order = fourier_order_for_span(span_days)
+        models = ([self.batch] if self.batch is not None else []) + list(self.singles.values())
+        if any(model.fourier_order != fourier_order for model in models):
+            return False
+        if not np.isfinite(values[:, self.complete]).all():
+            return False
+
+        if self.batch is not None:
+            self.batch.update(dates, values[:, self.complete])
+        for i, model in self.singles.items():
+            model.update(dates, values[:, i])
+        self.last_date = dates.max()
+        self.n_days += dates.nunique()
+        return True
+
+    def predict(self, dates, level=DEFAULT_INTERVAL_LEVEL):
+        """(mean, lower, upper) arrays of shape (len(dates), len(columns))"""
+        predictions = np.empty((3, len(dates), len(self.columns)))
+        if self.batch is not None:
+            predictions[:, :, self.complete] = self.batch.predict(dates, level)
+        for i, model in self.singles.items():
+            predictions[:, :, i] = model.predict(dates, level)
+        return predictions[0], predictions[1], predictions[2]
+
+
+def seasonal_forecast_from_history(history, days_ahead, level=DEFAULT_INTERVAL_LEVEL, fit=None):
+    """Seasonal least-squares forecast of every metric and product column"""
+    # Metrics and products are fit together: one solve for the whole menu
+    if fit is None:
+        fit = HistoryFit.fit(history)
+    dates = pd.date_range(fit.last_date + pd.Timedelta(days=1), periods=days_ahead, freq='D')
+    metric_columns = [col for col in fit.columns if col in BASE_COLUMNS]
+    product_columns = fit.columns[len(metric_columns):]
+    mean, lower, upper = (_non_negative_counts(values) for values in fit.predict(dates, level))
+
+    revenue, customers = mean[:, 0], mean[:, 1]
+    if 'staff' in history.columns:
+        staff = np.maximum(MIN_STAFF, mean[:, 2])
+    else:
+        staff = np.maximum(MIN_STAFF, np.ceil(customers * 0.1).astype(np.int64))
+
+    forecast = pd.DataFrame({
+        **_date_columns(dates),
+        'revenue': revenue,
+        'customers': customers,
+        'staff_needed': staff,
+        'day_of_week': dates.day_name(),
+        'revenue_lower': lower[:, 0],
+        'revenue_upper': upper[:, 0],
+        'customers_lower': lower[:, 1],
+        'customers_upper': upper[:, 1],
+    })
+
+    if not product_columns:
+        return forecast
+
+    products = pd.DataFrame(mean[:, len(metric_columns):], columns=product_columns)
+    return pd.concat([forecast, products], axis=1)
+
+
+def baseline_forecast_from_history(history, days_ahead, seed=DEFAULT_SEED):
+    """History-mean forecast with a sine trend and ±10% random variation"""
+    dates_history = pd.to_datetime(history['date'])
+    last_date = dates_history.max()
+
+    # Statistics are computed once, not once per forecast day
+    avg_revenue, avg_customers = _column_means(history, ['revenue', 'customers'])
+    product_columns = get_product_columns(history)
+    product_means = _column_means(history, product_columns)
+
+    # One factor per horizon day: seasonal trend times ±10% variation
+    steps = np.arange(days_ahead)
+    trend_factor = 1.0 + 0.1 * np.sin(2 * np.pi * steps / 365)
+    rng = forecast_rng(UPLOADED_STREAM, days_ahead, seed)
+    random_factor = 0.9 + rng.random(days_ahead) * 0.2
+    factor = trend_factor * random_factor
+
+    customers = _truncate(avg_customers * factor)
+    if 'staff' in history.columns:
+        avg_staff = _column_means(history, ['staff'])[0]
+        staff = np.maximum(MIN_STAFF, _truncate(avg_staff * factor))
+    else:
+        # Calculate based on customers (default logic)
+        staff = np.maximum(MIN_STAFF, np.ceil(customers * 0.1).astype(np.int64))
+
+    dates = pd.date_range(last_date + pd.Timedelta(days=1), periods=days_ahead, freq='D')
+    forecast = pd.DataFrame({
+        **_date_columns(dates),
+        'revenue': _truncate(avg_revenue * factor),
+        'customers': customers,
+        'staff_needed': staff,
+        'day_of_week': dates.day_name(),
+    })
+
+    if not product_columns:
+        return forecast
+
+    products = pd.DataFrame(
+        _truncate(np.outer(factor, product_means)),
+        columns=product_columns
+    )
+    return pd.concat([forecast, products], axis=1)
+
+
+def calculate_staff_requirement(customers, restaurant_key):
+    """Calculate staff needed based on customer volume (a count or an array of counts)"""
+    base_staff = restaurants[restaurant_key]['base_metrics']['staff_needed']
+    base_customers = restaurants[restaurant_key]['base_metrics']['customers']
+    staff_ratio = STAFF_RATIOS.get(restaurant_key, DEFAULT_STAFF_RATIO)
+
+    # Staff scaling formula: base staff + additional staff based on customer increase
+    calculated_staff = base_staff + (np.asarray(customers) - base_customers) * staff_ratio
+    staff = np.maximum(MIN_STAFF, np.ceil(calculated_staff).astype(np.int64))
+    return staff if staff.ndim else int(staff)
+
+
+def default_forecast_start():
+    """First day of the default restaurants' forecasts (tomorrow)"""
+    return pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+
+
+def synthetic_forecast_frames(restaurant_keys, days, start=None, seed=DEFAULT_SEED):
+    """Generate forecasts for default restaurants as a dict of restaurant key -> frame
+
+    Dates, weekend boost, seasonality and random variation are built as arrays
+    once for all keys; each frame has that restaurant's product columns. Each
+    restaurant draws from its own stream, so its numbers do not depend on
+    which other restaurants are in the batch.
+    """
+    if start is None:
+        start = default_forecast_start()
+    dates = pd.date_range(start, periods=days, freq='D')
+
+    # Add realistic variation
+    weekend_boost = np.where(dates.weekday >= 4, 1.3, 1.0)  # Friday, Saturday, Sunday
+    seasonal_factor = 1.0 + 0.2 * np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365)
+    random_variation = 0.85 + np.array([
+        forecast_rng(restaurant_key, days, seed).random(days) for restaurant_key in restaurant_keys
+    ]).reshape(len(restaurant_keys), days) * 0.3
+    multipliers = weekend_boost * seasonal_factor * random_variation
+
+    date_columns = _date_columns(dates)
+    day_of_week = dates.day_name()
+
+    frames = {}
+    for restaurant_key, multiplier in zip(restaurant_keys, multipliers):
+        base = restaurants[restaurant_key]['base_metrics']
+        customers = np.trunc(base['customers'] * multiplier).astype(np.int64)
+
+        frame = pd.DataFrame({
+            **date_columns,
+            'revenue': np.trunc(base['revenue'] * multiplier).astype(np.int64),
+            'customers': customers,
+            'staff_needed': calculate_staff_requirement(customers, restaurant_key),
+            'day_of_week': day_of_week,
+        })
+
+        # Product quantities for every day at once
+        base_quantities = np.array(list(base['products'].values()), dtype=np.float64)
+        products = pd.DataFrame(
+            np.trunc(np.outer(multiplier, base_quantities)).astype(np.int64),
+            columns=list(base['products'])
+        )
+        frames[restaurant_key] = pd.concat([frame, products], axis=1)
+
+    return frames
+
+
+def stack_forecasts(frames):
+    """Stack per-restaurant forecast frames into one frame with a leading ``restaurant`` column
+
+    Product columns are the union of the restaurants' products.
+    """
+    stacked = pd.concat(frames, names=['restaurant', None])
+    return stacked.reset_index(level='restaurant').reset_index(drop=True)
+
+
+def synthetic_forecast(restaurant_keys, days, start=None, seed=DEFAULT_SEED):
+    """Forecasts for several default restaurants stacked into one long frame"""
+    return stack_forecasts(synthetic_forecast_frames(restaurant_keys, days, start, seed))
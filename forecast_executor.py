@@ -0,0 +1,65 @@
+"""Per-restaurant forecasts in a worker pool.
+
+Each restaurant is an independent task, so the comparison view (and batch
+runs) scale with the number of sites by spreading them over threads or
+processes instead of generating them one after another.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from forecast_engine import DEFAULT_SEED, default_forecast_start, synthetic_forecast_frames
+from reconciliation import DEFAULT_RECONCILIATION, reconcile_frames, restaurant_items_per_customer
+
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def restaurant_forecast(restaurant_key, days, start, seed=DEFAULT_SEED, reconciliation=DEFAULT_RECONCILIATION):
+    """One restaurant's forecast, its products reconciled on their own like the dashboard's
+
+    Reconciliation is per restaurant, so a frame does not depend on which
+    other restaurants are forecast with it. ``reconciliation=None`` keeps the
+    products as generated.
+    """
+    frame = synthetic_forecast_frames([restaurant_key], days, start, seed)[restaurant_key]
+    if reconciliation is None:
+        return frame
+    return reconcile_frames(
+        {restaurant_key: frame},
+        {restaurant_key: restaurant_items_per_customer(restaurant_key)},
+        reconciliation
+    )[restaurant_key]
+
+
+def _timed_restaurant_forecast(restaurant_key, days, start, seed, reconciliation):
+    """One restaurant's forecast and the seconds it took (module level so processes can pickle it)"""
+    started = time.perf_counter()
+    frame = restaurant_forecast(restaurant_key, days, start, seed, reconciliation)
+    return frame, time.perf_counter() - started
+
+
+def run_restaurant_forecasts(restaurant_keys, days, workers=DEFAULT_WORKERS, use_processes=False, start=None,
+                             seed=DEFAULT_SEED, reconciliation=DEFAULT_RECONCILIATION):
+    """Forecast every restaurant in a pool
+
+    Returns ``(frames, timings)``: the forecast frame and the seconds spent for
+    each restaurant key, in the order of ``restaurant_keys``.
+    """
+    if not restaurant_keys:
+        return {}, {}
+    if start is None:
+        # Resolve once so every worker forecasts the same dates
+        start = default_forecast_start()
+    workers = max(1, min(workers, len(restaurant_keys)))
+    pool_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        futures = {
+            key: pool.submit(_timed_restaurant_forecast, key, days, start, seed, reconciliation)
+            for key in restaurant_keys
+        }
+        results = {key: future.result() for key, future in futures.items()}
+
+    frames = {key: frame for key, (frame, _) in results.items()}
+    timings = {key: seconds for key, (_, seconds) in results.items()}
+    return frames, timings
+
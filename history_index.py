@@ -0,0 +1,219 @@
+"""Sorted (site, date) index over daily history for fast range queries.
+
+Each site's days are kept in date order as a ``datetime64[D]`` array next to
+a matrix of its daily values (metrics and product quantities) and running
+(cumulative) sums of that matrix. A date range is found with two binary
+searches; the sum over any range is the difference of two cumulative-sum
+rows, so windowed totals and rolling 7/28-day sums never loop over days.
+
+New days are appended after a site's last date: arrays grow with spare
+capacity and the cumulative sums are extended, nothing is re-sorted. The
+index is saved as one ``.npz`` file next to the upload snapshots.
+
+Plain NumPy/pandas, no Streamlit imports.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from forecast_engine import UPLOADED_STREAM, get_product_columns
+from ingestion import CACHE_DIR
+
+INDEX_DIR = CACHE_DIR / 'index'
+ROLLING_WINDOWS = (7, 28)
+
+_METRICS = ['revenue', 'customers', 'staff']
+
+
+def index_path(digest, index_dir=INDEX_DIR):
+    return Path(index_dir) / f'{digest}.npz'
+
+
+def _day_array(dates):
+    return np.asarray(pd.to_datetime(dates).to_numpy(), dtype='datetime64[D]')
+
+
+class _SiteBlock:
+    """One site's dates, values and cumulative sums, with room to append"""
+
+    def __init__(self, dates, values):
+        self.size = len(dates)
+        self.dates = dates
+        self.values = values
+        self.cumsum = np.zeros((self.size + 1, values.shape[1]))
+        np.cumsum(np.nan_to_num(values), axis=0, out=self.cumsum[1:])
+
+    def append(self, dates, values):
+        needed = self.size + len(dates)
+        if needed > len(self.dates):
+            capacity = max(needed, 2 * len(self.dates))
+            self.dates = np.resize(self.dates, capacity)
+            self.values = np.resize(self.values, (capacity, self.values.shape[1]))
+            cumsum = np.zeros((capacity + 1, self.cumsum.shape[1]))
+            cumsum[:self.size + 1] = self.cumsum[:self.size + 1]
+            self.cumsum = cumsum
+        end = self.size + len(dates)
+        self.dates[self.size:end] = dates
+        self.values[self.size:end] = values
+        self.cumsum[self.size + 1:end + 1] = self.cumsum[self.size] + np.cumsum(np.nan_to_num(values), axis=0)
+        self.size = end
+
+    def span(self, start=None, end=None):
+        """Row positions [first, last) of the days from ``start`` through ``end``"""
+        dates = self.dates[:self.size]
+        first = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, 'D'), side='left'))
+        last = self.size if end is None else int(np.searchsorted(dates, np.datetime64(end, 'D'), side='right'))
+        return first, max(first, last)
+
+
+class HistoryIndex:
+    """Daily metric and product values per site, sorted by date"""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._positions = {column: i for i, column in enumerate(self.columns)}
+        self._sites = {}
+        # Columns holding only whole numbers come back out as integers
+        self._integral = np.ones(len(self.columns), dtype=bool)
+
+    def _track_integral(self, values):
+        self._integral &= (np.isfinite(values) & (values == np.trunc(values))).all(axis=0)
+
+    @classmethod
+    def from_history(cls, history, site=UPLOADED_STREAM):
+        """Index of one site's wide history frame (date, metrics, products)"""
+        columns = [col for col in _METRICS if col in history.columns] + get_product_columns(history)
+        index = cls(columns)
+        index.add_site(site, history['date'], history[columns].to_numpy(dtype=np.float64))
+        return index
+
+    @property
+    def sites(self):
+        return list(self._sites)
+
+    def __len__(self):
+        return sum(block.size for block in self._sites.values())
+
+    def add_site(self, site, dates, values):
+        """Index a site's days, sorted once here"""
+        dates = _day_array(dates)
+        order = np.argsort(dates, kind='stable')
+        dates, values = dates[order], np.asarray(values, dtype=np.float64)[order]
+        if len(dates) > 1 and (np.diff(dates) == np.timedelta64(0, 'D')).any():
+            raise ValueError(f"Duplicate dates for site {site!r}")
+        self._track_integral(values)
+        self._sites[site] = _SiteBlock(dates, values)
+
+    def append(self, site, dates, values):
+        """Add days after ``site``'s last indexed day, without re-sorting"""
+        block = self._sites.get(site)
+        if block is None:
+            self.add_site(site, dates, values)
+            return
+        dates = _day_array(dates)
+        values = np.asarray(values, dtype=np.float64).reshape(len(dates), len(self.columns))
+        if len(dates) == 0:
+            return
+        if (np.diff(dates) <= np.timedelta64(0, 'D')).any():
+            raise ValueError("Appended dates must be increasing")
+        if block.size and dates[0] <= block.dates[block.size - 1]:
+            raise ValueError(
+                f"Appended days must follow {block.dates[block.size - 1]}, the last indexed day of {site!r}"
+            )
+        self._track_integral(values)
+        block.append(dates, values)
+
+    def first_date(self, site=UPLOADED_STREAM):
+        return self._sites[site].dates[0]
+
+    def last_date(self, site=UPLOADED_STREAM):
+        block = self._sites[site]
+        return block.dates[block.size - 1]
+
+    def _column_positions(self, columns):
+        if columns is None:
+            return list(range(len(self.columns))), self.columns
+        return [self._positions[column] for column in columns], list(columns)
+
+    def range(self, site=UPLOADED_STREAM, start=None, end=None, columns=None):
+        """Frame of ``site``'s days from ``start`` through ``end`` (inclusive)"""
+        block = self._sites[site]
+        first, last = block.span(start, end)
+        positions, columns = self._column_positions(columns)
+        values = block.values[first:last, positions]
+        integral = self._integral[positions]
+        if integral.all():
+            frame = pd.DataFrame(values.astype(np.int64), columns=columns)
+        else:
+            frame = pd.DataFrame(values, columns=columns)
+            if integral.any():
+                frame = frame.astype({column: np.int64 for column, whole in zip(columns, integral) if whole})
+        frame.insert(0, 'date', block.dates[first:last].astype('datetime64[ns]'))
+        return frame
+
+    def last_days(self, site=UPLOADED_STREAM, days=56, columns=None):
+        """The ``days`` calendar days up to and including the site's last day"""
+        end = self.last_date(site)
+        return self.range(site, end - np.timedelta64(days - 1, 'D'), end, columns)
+
+    def rolling_sum(self, site=UPLOADED_STREAM, window=7, start=None, end=None, columns=None):
+        """Trailing ``window``-calendar-day sums for each day from ``start`` through ``end``
+
+        Windows are measured in calendar days, so a gap in the history
+        shortens the sum rather than reaching further back.
+        """
+        block = self._sites[site]
+        first, last = block.span(start, end)
+        dates = block.dates[:block.size]
+        window_start = np.searchsorted(dates, dates[first:last] - np.timedelta64(window - 1, 'D'), side='left')
+        positions, columns = self._column_positions(columns)
+        cumsum = block.cumsum[:, positions]
+        sums = cumsum[np.arange(first, last) + 1] - cumsum[window_start]
+        frame = pd.DataFrame(sums, columns=columns)
+        frame.insert(0, 'date', dates[first:last].astype('datetime64[ns]'))
+        return frame
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {'columns': np.array(self.columns, dtype=str), 'sites': np.array(self.sites, dtype=str)}
+        for i, block in enumerate(self._sites.values()):
+            arrays[f'dates_{i}'] = block.dates[:block.size]
+            arrays[f'values_{i}'] = block.values[:block.size]
+        tmp_path = path.with_name(path.name + '.tmp.npz')
+        np.savez(tmp_path, **arrays)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            index = cls(arrays['columns'].tolist())
+            for i, site in enumerate(arrays['sites'].tolist()):
+                index._track_integral(arrays[f'values_{i}'])
+                index._sites[site] = _SiteBlock(arrays[f'dates_{i}'], arrays[f'values_{i}'])
+        return index
+
+
+def load_index(digest, index_dir=INDEX_DIR):
+    """Previously saved index for ``digest``, or None"""
+    path = index_path(digest, index_dir)
+    if not path.exists():
+        return None
+    return HistoryIndex.load(path)
+
+
+def save_index(index, digest, index_dir=INDEX_DIR):
+    try:
+        index.save(index_path(digest, index_dir))
+    except OSError:
+        pass  # The index still works in memory; it is rebuilt next session
+
+
+def index_history(history, digest, index_dir=INDEX_DIR):
+    """Index of an uploaded history, loaded from disk when it was built before"""
+    index = load_index(digest, index_dir)
+    if index is None:
+        index = HistoryIndex.from_history(history)
+        save_index(index, digest, index_dir)
+    return index
@@ -0,0 +1,316 @@
+"""Upload ingestion: parse each distinct file once and keep a typed snapshot.
+
+Uploads are identified by a hash of their bytes. The first time a file is
+seen it is parsed, the date column is converted once and count columns are
+downcast; the result is written as a Parquet snapshot that later reruns and
+other sessions load instead of re-parsing the CSV/Excel file.
+
+Transaction-level CSV exports (one row per ticket line) are streamed in
+chunks and folded into daily totals, so memory grows with the number of
+distinct days rather than the number of ticket lines.
+
+Delta uploads carry only new days. They are checked against the stored
+history and appended to it under a key chained from the history's key and
+the delta's hash, so a refresh parses and stores only the new rows.
+"""
+import hashlib
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(os.environ.get('MASLOW_CACHE_DIR', Path(__file__).resolve().parent / '.cache'))
+SNAPSHOT_DIR = CACHE_DIR / 'uploads'
+
+# Ticket lines read per chunk when streaming transaction exports
+CHUNK_ROWS = 250_000
+
+# POS exports name the ticket-line columns differently from the daily template
+TRANSACTION_ALIASES = {
+    'timestamp': 'date',
+    'datetime': 'date',
+    'amount': 'revenue',
+    'line_total': 'revenue',
+    'covers': 'customers',
+    'ticket': 'ticket_id',
+    'receipt_id': 'ticket_id',
+    'dish': 'product',
+    'item': 'product',
+    'qty': 'quantity',
+    'quantity_sold': 'quantity',
+}
+# Kept in float64 by optimize_frame
+MONEY_COLUMNS = ('revenue',)
+TRANSACTION_COLUMNS = {'date', 'revenue', 'customers', 'ticket_id', 'staff', 'product', 'quantity'}
+
+
+def content_hash(data):
+    """SHA-256 of the uploaded bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_upload(file_name, data):
+    """Parse CSV or Excel bytes into a DataFrame"""
+    if file_name.endswith('.csv'):
+        return pd.read_csv(io.BytesIO(data))
+    return pd.read_excel(io.BytesIO(data))
+
+
+def optimize_frame(frame):
+    """Parse the date column and downcast count and ID columns to the smallest integer dtype
+
+    Money columns stay float64 (float32 loses cents above about €100k, in a
+    value or a sum), and so do columns with fractional or missing values.
+    """
+    frame = frame.copy()
+    if 'date' in frame.columns:
+        frame['date'] = pd.to_datetime(frame['date'])
+    for col in frame.columns:
+        dtype = frame[col].dtype
+        if pd.api.types.is_bool_dtype(dtype) or not pd.api.types.is_numeric_dtype(dtype):
+            continue
+        if col in MONEY_COLUMNS:
+            frame[col] = frame[col].astype(np.float64)
+            continue
+        # Whole-number floats (counts summed with fill values) become integers too
+        downcast = pd.to_numeric(frame[col], downcast='integer')
+        if pd.api.types.is_integer_dtype(downcast.dtype):
+            frame[col] = downcast
+    return frame
+
+
+def snapshot_path(digest, snapshot_dir=SNAPSHOT_DIR):
+    return Path(snapshot_dir) / f'{digest}.parquet'
+
+
+def load_snapshot(digest, snapshot_dir=SNAPSHOT_DIR):
+    """Previously ingested frame for ``digest``, or None"""
+    path = snapshot_path(digest, snapshot_dir)
+    if not path.exists():
+        return None
+    return pd.read_parquet(path)
+
+
+def save_snapshot(frame, digest, snapshot_dir=SNAPSHOT_DIR):
+    path = snapshot_path(digest, snapshot_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so a concurrent reader never sees a partial file
+    tmp_path = path.with_suffix('.tmp')
+    frame.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def _try_save_snapshot(frame, key, snapshot_dir):
+    try:
+        save_snapshot(frame, key, snapshot_dir)
+    except (ImportError, OSError, TypeError, ValueError):
+        # Columns Parquet cannot store (mixed object types) or an unwritable
+        # cache dir only cost the reuse, not the upload
+        pass
+
+
+def ingest_upload(file_name, data, digest=None, snapshot_dir=SNAPSHOT_DIR):
+    """Return (digest, frame) for uploaded bytes, parsing only unseen content"""
+    if digest is None:
+        digest = content_hash(data)
+    frame = load_snapshot(digest, snapshot_dir)
+    if frame is None:
+        frame = optimize_frame(parse_upload(file_name, data))
+        _try_save_snapshot(frame, digest, snapshot_dir)
+    return digest, frame
+
+
+def _transaction_column(name):
+    name = str(name).strip().lower()
+    return TRANSACTION_ALIASES.get(name, name)
+
+
+def _is_transaction_column(name):
+    return _transaction_column(name) in TRANSACTION_COLUMNS
+
+
+def is_transaction_frame(frame):
+    """Whether a parsed file has one row per ticket line (a product column) rather than one per day"""
+    return 'product' in {_transaction_column(col) for col in frame.columns}
+
+
+class DailyAggregator:
+    """Folds chunks of ticket lines into running daily totals
+
+    - revenue and customers (covers) are summed per day
+    - without a customers column, distinct ticket_id values per day are counted;
+      a ticket split across two chunks is counted once as long as the export
+      keeps a ticket's lines together
+    - staff is the maximum seen per day
+    - product/quantity lines are summed per day and product, with their
+      revenue; the daily frame gets one quantity column per product
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._totals = None
+        self._staff = None
+        self._lines = None
+        self._last_ticket = None
+
+    def add(self, chunk):
+        chunk = chunk.rename(columns=_transaction_column)
+        missing = {'date', 'revenue'} - set(chunk.columns)
+        if missing:
+            raise ValueError(f"Transaction file is missing columns: {sorted(missing)}")
+        self.rows += len(chunk)
+        day = pd.to_datetime(chunk['date']).dt.normalize().rename('date')
+
+        measures = ['revenue'] + (['customers'] if 'customers' in chunk.columns else [])
+        partial = chunk[measures].groupby(day).sum()
+        if 'customers' not in chunk.columns and 'ticket_id' in chunk.columns:
+            partial['customers'] = self._count_tickets(day, chunk['ticket_id'])
+        self._totals = partial if self._totals is None else self._totals.add(partial, fill_value=0)
+
+        if 'staff' in chunk.columns:
+            staff = chunk['staff'].groupby(day).max()
+            if self._staff is not None:
+                staff = pd.concat([self._staff, staff]).groupby(level=0).max()
+            self._staff = staff
+
+        if 'product' in chunk.columns:
+            quantity = chunk['quantity'] if 'quantity' in chunk.columns else pd.Series(1, index=chunk.index)
+            lines = pd.DataFrame({'quantity': quantity, 'revenue': chunk['revenue']})
+            lines = lines.groupby([day, chunk['product'].rename('product')]).sum()
+            self._lines = lines if self._lines is None else self._lines.add(lines, fill_value=0)
+
+    def _count_tickets(self, day, ticket_id):
+        tickets = pd.DataFrame({'date': day, 'ticket_id': ticket_id}).drop_duplicates()
+        counts = tickets.groupby('date').size()
+        first, last = tuple(tickets.iloc[0]), tuple(tickets.iloc[-1])
+        if first == self._last_ticket:
+            # The previous chunk ended in the middle of this ticket
+            counts[first[0]] -= 1
+        self._last_ticket = last
+        return counts
+
+    def result(self):
+        """Daily frame in the upload template layout (date, revenue, customers, staff, products)"""
+        if self._totals is None:
+            raise ValueError("Transaction file contains no rows")
+        daily = self._totals.sort_index()
+        if self._staff is not None:
+            daily['staff'] = self._staff.reindex(daily.index, fill_value=0)
+        if self._lines is not None:
+            products = self._lines['quantity'].unstack(fill_value=0).reindex(daily.index, fill_value=0)
+            daily = daily.join(products.rename(columns=str))
+        return optimize_frame(daily.reset_index())
+
+    def product_lines(self):
+        """Quantity and revenue per (date, product), or None without a product column"""
+        if self._lines is None:
+            return None
+        lines = self._lines.reset_index()
+        lines['product'] = lines['product'].astype(str)
+        return lines
+
+
+def stream_transactions(file_obj, progress=None, chunk_rows=CHUNK_ROWS):
+    """Fold a transaction-level CSV into a DailyAggregator one chunk at a time
+
+    ``progress(fraction, rows)`` is called after every chunk.
+    """
+    total_bytes = file_obj.seek(0, io.SEEK_END)
+    file_obj.seek(0)
+    aggregator = DailyAggregator()
+    with pd.read_csv(file_obj, chunksize=chunk_rows, usecols=_is_transaction_column) as reader:
+        for chunk in reader:
+            aggregator.add(chunk)
+            if progress is not None:
+                fraction = min(file_obj.tell() / total_bytes, 1.0) if total_bytes else 1.0
+                progress(fraction, aggregator.rows)
+    return aggregator
+
+
+def stream_daily_totals(file_obj, progress=None, chunk_rows=CHUNK_ROWS):
+    """Aggregate a transaction-level CSV to daily totals one chunk at a time"""
+    return stream_transactions(file_obj, progress, chunk_rows).result()
+
+
+def daily_snapshot_key(digest):
+    """Snapshot key of the daily aggregate of a transaction file"""
+    return f'{digest}-daily'
+
+
+def ingest_transactions(file_obj, digest, progress=None, chunk_rows=CHUNK_ROWS, snapshot_dir=SNAPSHOT_DIR):
+    """Return (snapshot key, daily frame) for a transaction-level CSV, streaming only unseen content"""
+    key = daily_snapshot_key(digest)
+    frame = load_snapshot(key, snapshot_dir)
+    if frame is None:
+        frame = stream_daily_totals(file_obj, progress, chunk_rows)
+        _try_save_snapshot(frame, key, snapshot_dir)
+    return key, frame
+
+
+def chain_digest(parent_digest, delta_digest):
+    """Key of a history after appending a delta file: changes when either part does"""
+    return hashlib.sha256(f'{parent_digest}+{delta_digest}'.encode()).hexdigest()
+
+
+def delta_snapshot_key(key):
+    """Snapshot key of the rows a delta upload appended"""
+    return f'{key}-delta'
+
+
+def delta_problems(history, delta, last_date=None):
+    """Reasons ``delta`` cannot be appended to ``history``, empty when it can
+
+    ``last_date`` is the last stored day, read from ``history`` when not given.
+    """
+    missing = [col for col in history.columns if col not in delta.columns]
+    extra = [col for col in delta.columns if col not in history.columns]
+    problems = []
+    if missing:
+        problems.append(f"missing columns {missing}")
+    if extra:
+        problems.append(f"columns not in the stored history {extra}")
+    if 'date' not in delta.columns:
+        return problems
+
+    not_numeric = [
+        col for col in history.columns
+        if col in delta.columns and col != 'date'
+        and pd.api.types.is_numeric_dtype(history[col]) and not pd.api.types.is_numeric_dtype(delta[col])
+    ]
+    if not_numeric:
+        problems.append(f"non-numeric values in {not_numeric}")
+
+    dates = pd.to_datetime(delta['date']).dt.normalize()
+    duplicated = dates[dates.duplicated()].dt.strftime('%Y-%m-%d').unique()
+    if len(duplicated):
+        problems.append(f"duplicate dates {list(duplicated[:5])}")
+    if last_date is None:
+        last_date = pd.to_datetime(history['date']).max()
+    overlap = (dates <= pd.Timestamp(last_date)).sum()
+    if overlap:
+        problems.append(f"{overlap} day(s) on or before {pd.Timestamp(last_date):%Y-%m-%d}, the last stored day")
+    return problems
+
+
+def append_delta(history, digest, file_name, data, last_date=None, snapshot_dir=SNAPSHOT_DIR):
+    """Return (chained key, delta rows) for a file of new days
+
+    Raises ValueError listing every problem when the file does not fit the
+    stored history. Only the delta is parsed and written to the snapshot
+    cache; the stored history is only checked for its columns, dtypes and
+    (when ``last_date`` is not given) its last day, and is not copied.
+    Extending it is left to the store (``columnar_store.append_mapped``).
+    """
+    key = chain_digest(digest, content_hash(data))
+    delta = load_snapshot(delta_snapshot_key(key), snapshot_dir)
+    if delta is None:
+        delta = optimize_frame(parse_upload(file_name, data))
+    problems = delta_problems(history, delta, last_date)
+    if problems:
+        raise ValueError("; ".join(problems))
+
+    delta = delta[list(history.columns)].sort_values('date', ignore_index=True)
+    _try_save_snapshot(delta, delta_snapshot_key(key), snapshot_dir)
+    return key, delta
@@ -0,0 +1,107 @@
+"""Opt-in stage timers for dashboard reruns.
+
+Wrap each stage of the script body in ``profiler.stage(name)``. When the
+profiler is disabled a stage costs one context-manager call. Finished reruns
+are kept in a rolling history that can be exported as JSON lines or in the
+Chrome trace event format (chrome://tracing, Perfetto) for offline analysis.
+"""
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_HISTORY_SIZE = 20
+
+# Profiling starts enabled when the server runs with MASLOW_PROFILE=1
+PROFILE_BY_DEFAULT = os.environ.get('MASLOW_PROFILE', '') == '1'
+
+
+class RerunProfiler:
+    """Stage timings of the current rerun and of the last ``history_size`` reruns"""
+
+    def __init__(self, history_size=DEFAULT_HISTORY_SIZE):
+        self.enabled = PROFILE_BY_DEFAULT
+        self.history = deque(maxlen=history_size)
+        self._current = None
+        self._started = None
+        self._depth = 0
+        self._reruns = 0
+
+    def start_rerun(self, enabled):
+        """Begin timing a rerun; an unfinished previous rerun (st.stop, interrupted run) is dropped"""
+        self.enabled = enabled
+        self._current = None
+        if not enabled:
+            return
+        self._reruns += 1
+        self._started = time.perf_counter()
+        self._current = {
+            'rerun': self._reruns,
+            'timestamp': time.time(),
+            'stages': [],
+        }
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one stage of the current rerun"""
+        if self._current is None:
+            yield
+            return
+        current = self._current
+        started = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            current['stages'].append({
+                'name': name,
+                'start_ms': (started - self._started) * 1000,
+                'duration_ms': (time.perf_counter() - started) * 1000,
+                'depth': self._depth,
+            })
+
+    def finish_rerun(self):
+        """Close the current rerun, add it to the history and return it (None when disabled)"""
+        if self._current is None:
+            return None
+        record = self._current
+        record['total_ms'] = (time.perf_counter() - self._started) * 1000
+        # Stages close innermost first; list them in the order they started
+        record['stages'].sort(key=lambda stage: stage['start_ms'])
+        self.history.append(record)
+        self._current = None
+        return record
+
+    def resize(self, history_size):
+        self.history = deque(self.history, maxlen=history_size)
+
+    def to_jsonl(self):
+        """One JSON object per recorded rerun"""
+        return '\n'.join(json.dumps(record) for record in self.history) + '\n'
+
+    def to_chrome_trace(self):
+        """Recorded reruns as Chrome trace 'complete' events, one row per rerun"""
+        events = []
+        for record in self.history:
+            rerun_start_us = record['timestamp'] * 1e6
+            events.append({
+                'name': f"rerun {record['rerun']}",
+                'ph': 'X',
+                'ts': rerun_start_us,
+                'dur': record['total_ms'] * 1000,
+                'pid': 1,
+                'tid': 1,
+            })
+            for stage in record['stages']:
+                events.append({
+                    'name': stage['name'],
+                    'ph': 'X',
+                    'ts': rerun_start_us + stage['start_ms'] * 1000,
+                    'dur': stage['duration_ms'] * 1000,
+                    'pid': 1,
+                    'tid': 1,
+                    'args': {'rerun': record['rerun']},
+                })
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'})
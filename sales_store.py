@@ -0,0 +1,206 @@
+"""Long-format store of daily sales for many sites, products and years.
+
+The app's frames are wide: one row per day with a column per product, dates
+held as strings or nanosecond timestamps and counts as int64. A store keeps
+two long tables instead:
+
+- ``daily``: site, date, day_of_week, revenue, customers, staff
+- ``sales``: site, date, product, quantity, revenue
+
+Site, product and day of week are categoricals, so each row carries small
+integer codes instead of strings. Counts are int32 when every value is a
+whole number and float32 otherwise; revenue stays float64, like
+``ingestion.MONEY_COLUMNS``, so a site's cents still add up. Product lines with no sales (zero or a
+product a site does not sell) are not stored, which is where most of the
+saving on multi-site menus comes from. Dates are ``datetime64[s]``: pandas
+has no day resolution, seconds are the coarsest unit it supports.
+
+Plain pandas/NumPy, no Streamlit imports.
+"""
+import numpy as np
+import pandas as pd
+
+from forecast_engine import forecast_product_columns
+from ingestion import parse_upload, stream_transactions
+
+DATE_DTYPE = 'datetime64[s]'
+DAY_OF_WEEK = pd.CategoricalDtype(
+    ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'], ordered=True
+)
+
+DAILY_COLUMNS = ['site', 'date', 'day_of_week', 'revenue', 'customers', 'staff']
+SALES_COLUMNS = ['site', 'date', 'product', 'quantity', 'revenue']
+
+
+def _measure(values):
+    """int32 when every value is a whole number that fits, else float32"""
+    values = np.asarray(values, dtype=np.float64)
+    info = np.iinfo(np.int32)
+    if (np.isfinite(values).all() and (values == np.trunc(values)).all()
+            and (len(values) == 0 or (values.min() >= info.min and values.max() <= info.max))):
+        return values.astype(np.int32)
+    return values.astype(np.float32)
+
+
+def _categorical(codes, categories):
+    return pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object))
+
+
+def _table(frame, columns, name):
+    """``frame`` with exactly ``columns``, in order"""
+    missing = [col for col in columns if col not in frame.columns]
+    if missing:
+        raise ValueError(f"SalesStore {name} table is missing columns {missing}")
+    return frame[columns]
+
+
+def _wide_dates(wide):
+    """Dates of a wide frame: ISO ``full_date`` for forecasts, ``date`` for histories"""
+    column = 'full_date' if 'full_date' in wide.columns else 'date'
+    return pd.DatetimeIndex(pd.to_datetime(wide[column])).normalize()
+
+
+class SalesStore:
+    """Daily totals and product sales lines of one or more sites in long format"""
+
+    def __init__(self, daily, sales):
+        daily, sales = _table(daily, DAILY_COLUMNS, 'daily'), _table(sales, SALES_COLUMNS, 'sales')
+        self.daily = daily.sort_values(['site', 'date'], kind='stable').reset_index(drop=True)
+        self.sales = sales.sort_values(['site', 'date', 'product'], kind='stable').reset_index(drop=True)
+
+    @classmethod
+    def from_wide(cls, wide, site):
+        """Store of one site's wide frame: an uploaded history or a forecast
+
+        Forecast frames are recognised by their ``full_date`` column; their
+        ``staff_needed`` becomes ``staff`` and interval columns are dropped.
+        """
+        dates = _wide_dates(wide)
+        n = len(wide)
+        if 'staff' in wide.columns:
+            staff = wide['staff']
+        elif 'staff_needed' in wide.columns:
+            staff = wide['staff_needed']
+        else:
+            staff = np.full(n, np.nan)
+        daily = pd.DataFrame({
+            'site': _categorical(np.zeros(n, dtype=np.int8), [site]),
+            'date': dates.to_numpy().astype(DATE_DTYPE),
+            'day_of_week': pd.Categorical.from_codes(dates.weekday, dtype=DAY_OF_WEEK),
+            'revenue': wide['revenue'].to_numpy(dtype=np.float64),
+            'customers': _measure(wide['customers']),
+            'staff': _measure(staff),
+        })
+
+        products = forecast_product_columns(wide)
+        quantities = wide[products].to_numpy(dtype=np.float64)
+        row, product = np.nonzero(np.nan_to_num(quantities) != 0)
+        sales = pd.DataFrame({
+            'site': _categorical(np.zeros(len(row), dtype=np.int8), [site]),
+            'date': daily['date'].to_numpy()[row],
+            'product': _categorical(product, products),
+            'quantity': _measure(quantities[row, product]),
+            'revenue': np.full(len(row), np.nan),
+        })
+        return cls(daily, sales)
+
+    @classmethod
+    def from_stacked(cls, stacked, site_column='restaurant'):
+        """Store of a stacked multi-site forecast frame (see ``stack_forecasts``)"""
+        return cls.concat([
+            cls.from_wide(frame.reset_index(drop=True), site)
+            for site, frame in stacked.groupby(site_column, sort=False)
+        ])
+
+    @classmethod
+    def from_upload(cls, file_name, data, site):
+        """Store of an uploaded daily CSV/Excel file"""
+        return cls.from_wide(parse_upload(file_name, data), site)
+
+    @classmethod
+    def from_transactions(cls, file_obj, site, progress=None):
+        """Store of a transaction-level CSV, keeping each product's revenue"""
+        aggregator = stream_transactions(file_obj, progress)
+        store = cls.from_wide(aggregator.result(), site)
+        lines = aggregator.product_lines()
+        if lines is None:
+            return store
+        lines = lines[lines['quantity'] != 0]
+        products = pd.unique(lines['product'])
+        sales = pd.DataFrame({
+            'site': _categorical(np.zeros(len(lines), dtype=np.int8), [site]),
+            'date': pd.to_datetime(lines['date']).to_numpy().astype(DATE_DTYPE),
+            'product': _categorical(pd.Index(products).get_indexer(lines['product']), products),
+            'quantity': _measure(lines['quantity']),
+            'revenue': lines['revenue'].to_numpy(dtype=np.float64),
+        })
+        return cls(store.daily, sales)
+
+    @classmethod
+    def concat(cls, stores):
+        """One store of several, with site and product categories merged"""
+        dailies = [store.daily for store in stores]
+        sales = [store.sales for store in stores]
+        for frames, columns in ((dailies, ['site']), (sales, ['site', 'product'])):
+            for column in columns:
+                categories = pd.unique(np.concatenate([frame[column].cat.categories for frame in frames]))
+                for i, frame in enumerate(frames):
+                    frames[i] = frame.assign(**{column: frame[column].cat.set_categories(categories)})
+        daily = pd.concat(dailies, ignore_index=True)
+        for column in ('customers', 'staff'):
+            daily[column] = _measure(daily[column])
+        line_items = pd.concat(sales, ignore_index=True)
+        line_items['quantity'] = _measure(line_items['quantity'])
+        return cls(daily, line_items)
+
+    @property
+    def sites(self):
+        return list(self.daily['site'].cat.categories)
+
+    @property
+    def products(self):
+        return list(self.sales['product'].cat.categories)
+
+    def memory_bytes(self):
+        return int(self.daily.memory_usage(deep=True).sum() + self.sales.memory_usage(deep=True).sum())
+
+    def site_totals(self):
+        """Revenue, customers and items summed per site, with the site's average staff"""
+        totals = self.daily.groupby('site', observed=True, sort=False).agg(
+            revenue=('revenue', 'sum'),
+            customers=('customers', 'sum'),
+            staff=('staff', 'mean'),
+        )
+        items = self.sales.groupby('site', observed=True, sort=False)['quantity'].sum()
+        totals['items'] = items.reindex(totals.index, fill_value=0)
+        totals = totals.reset_index()
+        totals['site'] = totals['site'].astype(object)
+        return totals
+
+    def to_wide(self, site=None):
+        """One site's history in the upload layout the forecast engine reads
+
+        Products that site never sold are left out; days without a sales
+        line for a product get 0.
+        """
+        if site is None:
+            if len(self.sites) != 1:
+                raise ValueError(f"Store holds {len(self.sites)} sites, pass one of {self.sites}")
+            site = self.sites[0]
+        daily = self.daily[self.daily['site'] == site]
+        sales = self.sales[self.sales['site'] == site]
+
+        wide = pd.DataFrame({
+            'date': pd.DatetimeIndex(daily['date']).as_unit('ns'),
+            'revenue': daily['revenue'].to_numpy(),
+            'customers': daily['customers'].to_numpy(),
+        })
+        if daily['staff'].notna().any():
+            wide['staff'] = daily['staff'].to_numpy()
+
+        product = sales['product'].cat.remove_unused_categories()
+        quantities = np.zeros((len(wide), len(product.cat.categories)), dtype=sales['quantity'].dtype)
+        row = np.searchsorted(daily['date'].to_numpy(), sales['date'].to_numpy())
+        quantities[row, product.cat.codes.to_numpy()] = sales['quantity'].to_numpy()
+        products = pd.DataFrame(quantities, columns=list(product.cat.categories))
+        return pd.concat([wide, products], axis=1)
@@ -0,0 +1,162 @@
+"""Seasonal least-squares model: trend + day-of-week + yearly Fourier terms.
+
+A model keeps only the sufficient statistics of its fit (X'X, X'y, y'y and the
+row count), never the history itself. Appending a day of sales adds that
+day's row to the statistics, so an update costs the same whatever the length
+of the history; coefficients and the residual variance are re-derived from
+the statistics with one small solve the next time the model predicts.
+
+Several series observed on the same dates (a menu of product columns) share
+the design matrix: fitting them as the columns of one 2-D array costs a
+single X'X and a single solve, whatever the number of series.
+
+Plain NumPy/pandas, no Streamlit imports.
+"""
+import statistics
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FOURIER_ORDER = 3
+DEFAULT_RIDGE = 1.0
+DEFAULT_INTERVAL_LEVEL = 0.8
+DAYS_PER_YEAR = 365.25
+
+# Histories shorter than a year cannot separate yearly seasonality from the
+# trend, so they are fit without Fourier terms
+YEARLY_MIN_DAYS = 365
+
+# Below this many days the fit is mostly ridge penalty; use the mean forecast
+MIN_HISTORY_DAYS = 14
+
+
+def n_features(fourier_order):
+    """Intercept, trend, six weekday dummies and a sin/cos pair per Fourier order"""
+    return 8 + 2 * fourier_order
+
+
+def calendar_features(dates, origin, fourier_order):
+    """Design matrix of ``dates``, one row per date
+
+    Columns: intercept, trend in years since ``origin``, Tuesday..Sunday
+    dummies (Monday is the baseline), then sin/cos of the yearly cycle for
+    orders 1..``fourier_order``.
+    """
+    dates = pd.DatetimeIndex(dates).normalize()
+    days = ((dates - origin) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+    weekday = dates.weekday.to_numpy()
+
+    features = np.empty((len(dates), n_features(fourier_order)))
+    features[:, 0] = 1.0
+    features[:, 1] = days / DAYS_PER_YEAR
+    features[:, 2:8] = weekday[:, None] == np.arange(1, 7)
+    if fourier_order:
+        angles = 2 * np.pi * np.outer(days / DAYS_PER_YEAR, np.arange(1, fourier_order + 1))
+        features[:, 8::2] = np.sin(angles)
+        features[:, 9::2] = np.cos(angles)
+    return features
+
+
+def fourier_order_for_span(span_days):
+    """Yearly Fourier order for a history spanning ``span_days`` days"""
+    return DEFAULT_FOURIER_ORDER if span_days >= YEARLY_MIN_DAYS else 0
+
+
+def interval_z(level):
+    """Two-sided normal quantile for a central interval of ``level``"""
+    return statistics.NormalDist().inv_cdf(0.5 + level / 2)
+
+
+class SeasonalModel:
+    """Ridge least-squares fit of a daily series, updatable one day at a time
+
+    With ``n_series`` set, the model fits that many series at once: values
+    are (days, n_series) arrays and predictions have one column per series.
+    """
+
+    def __init__(self, origin, fourier_order=DEFAULT_FOURIER_ORDER, ridge=DEFAULT_RIDGE, n_series=None):
+        self.origin = pd.Timestamp(origin).normalize()
+        self.fourier_order = fourier_order
+        self.ridge = ridge
+        size = n_features(fourier_order)
+        series_shape = () if n_series is None else (n_series,)
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros((size,) + series_shape)
+        self.yty = np.zeros(series_shape)
+        self.n = 0
+        self.last_date = None
+        self._solution = None
+
+    @classmethod
+    def fit(cls, dates, values, fourier_order=None, ridge=DEFAULT_RIDGE):
+        """Fit a daily series, or the columns of a 2-D array as one batch
+
+        Yearly terms are used only when the history spans a year.
+        """
+        dates = pd.DatetimeIndex(dates).normalize()
+        values = np.asarray(values, dtype=np.float64)
+        if fourier_order is None:
+            span_days = (dates.max() - dates.min()).days + 1
+            fourier_order = fourier_order_for_span(span_days)
+        n_series = values.shape[1] if values.ndim == 2 else None
+        return cls(dates.min(), fourier_order, ridge, n_series).update(dates, values)
+
+    def update(self, dates, values):
+        """Add one or more observed days to the fit
+
+        Days with a missing value are skipped; in a batch, a day counts only
+        when every series has a value for it.
+        """
+        dates = pd.DatetimeIndex(np.atleast_1d(dates)).normalize()
+        y = np.asarray(values, dtype=np.float64).reshape((len(dates),) + self.yty.shape)
+        observed = np.isfinite(y).reshape(len(dates), -1).all(axis=1)
+        X = calendar_features(dates[observed], self.origin, self.fourier_order)
+        y = y[observed]
+
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.yty += (y * y).sum(axis=0)
+        self.n += len(y)
+        if len(y):
+            newest = dates[observed].max()
+            self.last_date = newest if self.last_date is None else max(self.last_date, newest)
+        self._solution = None
+        return self
+
+    def _solve(self):
+        """Coefficients, their unscaled covariance and the residual variance"""
+        if self._solution is None:
+            # The intercept is not shrunk, so a flat series keeps its level
+            penalty = np.full(len(self.xty), float(self.ridge))
+            penalty[0] = 0.0
+            inverse = np.linalg.pinv(self.xtx + np.diag(penalty))
+            coef = inverse @ self.xty
+
+            # Residual sum of squares from the statistics: y'y - 2b'X'y + b'X'Xb,
+            # one per series
+            rss = self.yty - 2 * (coef * self.xty).sum(axis=0) + (coef * (self.xtx @ coef)).sum(axis=0)
+            rss = np.maximum(rss, 0.0)
+            hat = inverse @ self.xtx
+            dof = max(self.n - np.trace(hat), 1.0)
+            self._solution = (coef, hat @ inverse, rss / dof)
+        return self._solution
+
+    @property
+    def coefficients(self):
+        return self._solve()[0]
+
+    @property
+    def residual_std(self):
+        std = np.sqrt(self._solve()[2])
+        return float(std) if std.ndim == 0 else std
+
+    def predict(self, dates, level=DEFAULT_INTERVAL_LEVEL):
+        """Return (mean, lower, upper) arrays for ``dates``, shaped (days,) or (days, n_series)"""
+        X = calendar_features(dates, self.origin, self.fourier_order)
+        coef, coef_cov, variance = self._solve()
+        mean = X @ coef
+
+        # Prediction variance: a new day's noise plus the coefficients' uncertainty
+        leverage = np.einsum('ij,jk,ik->i', X, coef_cov, X)
+        spread = interval_z(level) * np.sqrt(np.multiply.outer(1 + leverage, variance))
+        return mean, mean - spread, mean + spread
@@ -0,0 +1,369 @@
+"""Process-wide cache of ingested datasets and forecasts shared by every session.
+
+Each browser session has its own ``st.session_state``, so a cache kept there
+holds one copy of the same forecast per manager looking at it. The app keeps
+a single SharedCache per server process instead (``st.cache_resource``), and
+each session reads it through a SessionCache, a get/put/get_or_compute
+view with the session's own hit counters.
+
+- Entries are keyed by content: upload hashes, and forecast keys built from
+  them or from a restaurant key, so equal data in two sessions is one entry.
+- Each session holds a reference to the entries it used most recently (its
+  own LRU of ``max_entries`` keys). Held entries are never evicted; the
+  memory budget (``MASLOW_SHARED_CACHE_MB``, a server setting no session
+  can change) is enforced by evicting unheld entries, least recently used
+  first, so memory grows with the distinct data in use, not with sessions.
+- A session's references are released when it drops a key, clears its cache
+  or is garbage collected after its browser tab closes.
+- With a spill directory, evicted frames are written as uncompressed Arrow
+  files and read back memory-mapped on the next request, so a forecast
+  nobody held for a while costs a file map instead of a recompute, and the
+  OS page cache shares the pages between server processes.
+- Two sessions asking for the same missing entry compute it once; the
+  second waits for the first.
+
+Frames handed out are shared between sessions and must be treated as
+read-only.
+
+Plain Python/pandas, no Streamlit imports.
+"""
+import hashlib
+import itertools
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+from forecast_cache import DEFAULT_MAX_ENTRIES
+from ingestion import CACHE_DIR
+
+SPILL_DIR = CACHE_DIR / 'shared'
+DEFAULT_BUDGET_BYTES = int(os.environ.get('MASLOW_SHARED_CACHE_MB', '256')) * 1024 * 1024
+SPILL_BY_DEFAULT = os.environ.get('MASLOW_SHARED_CACHE_SPILL', '') == '1'
+
+# Sessions hold the dataset they work on, and nothing older
+DATASET_ENTRIES = 1
+
+
+def dataset_key(digest):
+    """Cache key of an ingested upload, apart from the forecast keys built on it"""
+    return ('dataset', digest)
+
+
+def value_size(value):
+    """Bytes held by a cached frame"""
+    return int(value.memory_usage(deep=True).sum())
+
+
+def spill_path(key, spill_dir=SPILL_DIR):
+    return Path(spill_dir) / f'{hashlib.sha256(repr(key).encode()).hexdigest()}.arrow'
+
+
+class SharedCache:
+    """Thread-safe LRU of frames with per-session references and a byte budget"""
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_BYTES, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = None if spill_dir is None else Path(spill_dir)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_loads = 0
+        # key -> [frame, size, ids of the sessions holding it]
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._sessions = set()
+        self._session_ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def open_session(self, max_entries=DEFAULT_MAX_ENTRIES, session_id=None):
+        """A view of the cache for one session, released when it is garbage collected
+
+        Views opened with the ``session_id`` of an earlier view belong to the
+        same session.
+        """
+        with self._lock:
+            if session_id is None:
+                session_id = next(self._session_ids)
+            self._sessions.add(session_id)
+        return SessionCache(self, session_id, max_entries)
+
+    def close_session(self, session_id):
+        with self._lock:
+            self._sessions.discard(session_id)
+            self.release(session_id)
+
+    def get(self, key, holder=None):
+        """Cached frame for ``key`` or None; ``holder`` takes a reference to it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                frame = self._load_spilled(key)
+                if frame is None:
+                    self.misses += 1
+                    return None
+                entry = self._store(key, frame)
+                if entry is None:
+                    self.hits += 1
+                    return frame
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if holder is not None:
+                entry[2].add(holder)
+            # A reloaded spill counts against the budget like any stored frame
+            self._evict()
+            return entry[0]
+
+    def put(self, key, frame, holder=None):
+        """Store a frame, evicting unheld entries past the budget"""
+        if frame is None:
+            return
+        with self._lock:
+            entry = self._store(key, frame)
+            if entry is not None and holder is not None:
+                entry[2].add(holder)
+            self._evict()
+
+    def get_or_compute(self, key, compute, holder=None):
+        """(frame, computed) for ``key``, calling ``compute()`` once on a miss
+
+        A session that misses while another is computing the same key waits
+        for that result instead of computing it again.
+        """
+        with self._lock:
+            frame = self.get(key, holder)
+            if frame is not None:
+                return frame, False
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = threading.Event()
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            pending.wait()
+            frame = self.get(key, holder)
+            if frame is not None:
+                return frame, False
+            # The other session's compute failed or its result was too large to keep
+            frame = compute()
+            self.put(key, frame, holder)
+            return frame, True
+
+        try:
+            frame = compute()
+            self.put(key, frame, holder)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.set()
+        return frame, True
+
+    def release(self, holder, keys=None):
+        """Drop ``holder``'s references to ``keys`` (all of them when None)"""
+        with self._lock:
+            entries = self._entries.values() if keys is None else filter(None, map(self._entries.get, keys))
+            for entry in entries:
+                entry[2].discard(holder)
+            self._evict()
+
+    def discard(self, keys):
+        """Remove entries nobody holds (and their spill files) now rather than on eviction"""
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and not entry[2]:
+                    self._remove(key)
+                if self.spill_dir is not None:
+                    spill_path(key, self.spill_dir).unlink(missing_ok=True)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def size_of(self, keys):
+        with self._lock:
+            return sum(self._entries[key][1] for key in keys if key in self._entries)
+
+    def stats(self):
+        """Counters for display"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'held': sum(1 for entry in self._entries.values() if entry[2]),
+                'bytes': self.current_bytes,
+                'sessions': len(self._sessions),
+                'evictions': self.evictions,
+                'spill_loads': self.spill_loads,
+            }
+
+    def _store(self, key, frame):
+        size = value_size(frame)
+        if size > self.max_bytes:
+            return None
+        holders = set()
+        if key in self._entries:
+            holders = self._entries[key][2]
+            self._remove(key)
+        entry = self._entries[key] = [frame, size, holders]
+        self.current_bytes += size
+        return entry
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+    def _evict(self):
+        if self.current_bytes <= self.max_bytes:
+            return
+        for key in [key for key, entry in self._entries.items() if not entry[2]]:
+            if self.current_bytes <= self.max_bytes:
+                break
+            frame = self._entries[key][0]
+            self._remove(key)
+            self.evictions += 1
+            self._spill(key, frame)
+
+    def _spill(self, key, frame):
+        if self.spill_dir is None:
+            return
+        path = spill_path(key, self.spill_dir)
+        if path.exists():
+            return
+        try:
+            from pyarrow import feather
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            feather.write_feather(frame, tmp_path, compression='uncompressed')
+            os.replace(tmp_path, path)
+        except (ImportError, OSError, TypeError, ValueError, NotImplementedError):
+            pass  # Frames Arrow cannot store are recomputed instead
+
+    def _load_spilled(self, key):
+        if self.spill_dir is None:
+            return None
+        path = spill_path(key, self.spill_dir)
+        if not path.exists():
+            return None
+        try:
+            from pyarrow import feather
+
+            frame = feather.read_table(path, memory_map=True).to_pandas(split_blocks=True)
+        except (ImportError, OSError, TypeError, ValueError, NotImplementedError):
+            return None
+        self.spill_loads += 1
+        return frame
+
+
+class SessionCache:
+    """One session's view of a SharedCache
+
+    Keeps the session's own hit/miss counters and holds references to the
+    ``max_entries`` keys it used most recently.
+    """
+
+    def __init__(self, shared, session_id, max_entries=DEFAULT_MAX_ENTRIES):
+        self.shared = shared
+        self.session_id = session_id
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._held = OrderedDict()
+        # Runs when the session's state is dropped, so its references do not outlive it
+        weakref.finalize(self, shared.close_session, session_id)
+
+    def __len__(self):
+        return len(self._held)
+
+    def __contains__(self, key):
+        return key in self.shared
+
+    @property
+    def max_bytes(self):
+        return self.shared.max_bytes
+
+    @property
+    def current_bytes(self):
+        return self.shared.size_of(list(self._held))
+
+    def get(self, key):
+        """Cached forecast for ``key`` or None, counting the hit or miss"""
+        forecast = self.shared.get(key, self.session_id)
+        if forecast is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._hold(key)
+        return forecast
+
+    def put(self, key, forecast):
+        if forecast is None:
+            return
+        self.shared.put(key, forecast, self.session_id)
+        self._hold(key)
+
+    def get_or_compute(self, key, compute):
+        """Cached forecast for ``key``, calling ``compute()`` on a miss in every session"""
+        forecast, computed = self.shared.get_or_compute(key, compute, self.session_id)
+        if computed:
+            self.misses += 1
+        else:
+            self.hits += 1
+        if forecast is not None:
+            self._hold(key)
+        return forecast
+
+    def discard_source(self, source):
+        """Release every forecast of ``source`` and drop those no other session holds"""
+        keys = [key for key in self.shared.keys() if isinstance(key, tuple) and key[0] == source]
+        self._release(keys)
+        self.shared.discard(keys)
+
+    def clear(self):
+        """Release this session's entries and drop those no other session holds"""
+        keys = list(self._held)
+        self._release(keys)
+        self.shared.discard(keys)
+
+    def stats(self):
+        """Counters for display: this session's, with the shared cache's under 'shared'"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self._held),
+            'bytes': self.current_bytes,
+            'shared': self.shared.stats(),
+        }
+
+    def _hold(self, key):
+        self._held[key] = None
+        self._held.move_to_end(key)
+        self._trim()
+
+    def _trim(self):
+        released = []
+        while len(self._held) > self.max_entries:
+            released.append(self._held.popitem(last=False)[0])
+        if released:
+            self.shared.release(self.session_id, released)
+
+    def _release(self, keys):
+        for key in keys:
+            self._held.pop(key, None)
+        self.shared.release(self.session_id, keys)